@@ -1,14 +1,19 @@
-from flask import Flask, request, jsonify, session, render_template, send_from_directory, redirect, url_for
+from flask import Flask, Request, g, has_request_context, request, jsonify, session, render_template, send_file, redirect, url_for
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, bindparam, case, func, tuple_, update, select
+from sqlalchemy.engine import Engine
 from sqlalchemy.exc import OperationalError as SQLAlchemyOperationalError
+from sqlalchemy.orm import selectinload, defer
 from werkzeug.utils import secure_filename
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import generate_password_hash, check_password_hash, safe_join
 from datetime import datetime, timedelta
 from secrets import token_hex 
 import os
 import json
+import logging
+import mimetypes
+from urllib.parse import quote
 import requests
 import base64
 import hashlib 
@@ -16,6 +21,27 @@ import random
 import pymysql
 from math import radians, sin, cos, sqrt, atan2
 import time
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from metrics import COUNT_BUCKETS, SIZE_BUCKETS, MetricsRegistry
+from structured_log import configure_logging
+from query_profiler import QueryProfiler, RequestProfile, parse_budgets
+from triage_cache import MemoryCacheBackend, build_triage_cache, triage_cache_key
+from gemini_client import GeminiClient, CircuitOpenError
+from image_pipeline import DECODE_ERRORS, MIME_TYPES, derivative_path, encode_image_for_model, ensure_derivative
+from retriage import TRIAGE_FIELDS, RateLimiter, load_checkpoint, save_checkpoint, triage_changes
+from migrations import run_migrations, check_index_usage
+from draft_store import DraftStore, is_tombstone
+from audit_cache import AuditResponseCache
+from image_prefilter import MODEL, REJECT, ImagePrefilter
+from phash_index import PerceptualIndex, fingerprint_to_hex, image_fingerprint
+from blob_store import BlobStore, HashingSpoolFile, blob_extension, blob_sha256, blob_store_root, stream_sha256, upload_sha256
+from ledger import GENESIS_HASH, BlockBuilder, ChainVerifier, block_signature, compute_entry_hash, merkle_proof, merkle_root, verify_merkle_proof
+import click
+
+# Logs go to stdout as JSON lines carrying the request ID (see structured_log.py).
+configure_logging(os.getenv('LOG_LEVEL', 'INFO'))
+logger = logging.getLogger(__name__)
 
 def get_db_connection_string():
     """
@@ -24,6 +50,10 @@ def get_db_connection_string():
     This is essential for secure cloud deployment (e.g., on Render), 
     as it avoids hardcoding sensitive credentials.
     """
+    # A complete DB_URL (e.g. a scratch database for benchmarks) overrides the individual DB_* parts.
+    if os.environ.get("DB_URL"):
+        return os.environ["DB_URL"]
+
     # Reads environment variables provided by the deployment platform
     # The default values are fallbacks, but should be set explicitly on Render/Cloud.
     DB_USER = os.environ.get("DB_USER", "rtgs_db_user")
@@ -46,10 +76,10 @@ try:
     )
     # This line attempts to connect immediately to verify credentials
     with engine.connect() as connection:
-        print("Database connection verified successfully!")
+        logger.info("Database connection verified")
 except Exception as e:
     # Log a failure, but often the app continues to start
-    print(f"FATAL: Database connection failed. Error: {e}")
+    logger.critical("Database connection failed", extra={'error': str(e)})
     engine = None 
 
 app = Flask(__name__)
@@ -62,8 +92,224 @@ COMPLAINT_UPLOAD_FOLDER = 'uploads/complaints'
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['COMPLAINT_UPLOAD_FOLDER'] = COMPLAINT_UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024 
+
+# Attachments are stored once per distinct content under uploads/blobs (see blob_store.py).
+# A relative BLOB_STORE_ROOT is taken relative to the app directory, like UPLOADS_ROOT.
+app.config['BLOB_STORE_ROOT'] = blob_store_root(app.root_path)
+
+# A resolution photo within IMAGE_DUPLICATE_MAX_DISTANCE bits (dHash and pHash, out of 64) of any
+# earlier upload is treated as a reused photo and fails the CV audit without a model call.
+app.config['IMAGE_DUPLICATE_MAX_DISTANCE'] = int(os.getenv('IMAGE_DUPLICATE_MAX_DISTANCE', 6))
+
+# Local pre-filter run before any vision call (see image_prefilter.py). Photos that are undecodable,
+# smaller than MIN_EDGE px, near-uniform (grey-level stddev), low-entropy (bits) or blurred
+# (variance of the Laplacian) are rejected without a model call.
+app.config['IMAGE_PREFILTER_ENABLED'] = os.getenv('IMAGE_PREFILTER_ENABLED', 'true').lower() == 'true'
+app.config['IMAGE_PREFILTER_MIN_EDGE'] = int(os.getenv('IMAGE_PREFILTER_MIN_EDGE', 64))
+app.config['IMAGE_PREFILTER_MIN_STDDEV'] = float(os.getenv('IMAGE_PREFILTER_MIN_STDDEV', 4.0))
+app.config['IMAGE_PREFILTER_MIN_ENTROPY'] = float(os.getenv('IMAGE_PREFILTER_MIN_ENTROPY', 2.0))
+app.config['IMAGE_PREFILTER_MIN_SHARPNESS'] = float(os.getenv('IMAGE_PREFILTER_MIN_SHARPNESS', 5.0))
+
+class UploadRequest(Request):
+    """Spools every uploaded file to disk beside the blob store, hashing it as it is parsed."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        spool = HashingSpoolFile(app.config['BLOB_STORE_ROOT'])
+        self.__dict__.setdefault('upload_spools', []).append(spool)
+        return spool
+
+app.request_class = UploadRequest
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, so a statement that raises leaves nothing behind to mis-pair.
+    context.query_started = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def record_query_time(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context.query_started
+    DB_QUERIES.inc()
+    DB_QUERY_TIME.inc(elapsed)
+    if has_request_context() and 'db_queries' in g:
+        g.db_queries += 1
+        g.db_seconds += elapsed
+        profile = g.get('query_profile')
+        if profile is not None:
+            profile.record(statement, parameters, elapsed, executemany)
+
+def build_query_profiler():
+    return QueryProfiler(
+        slow_ms=app.config['QUERY_PROFILER_SLOW_MS'],
+        repeat_threshold=app.config['QUERY_PROFILER_REPEAT_THRESHOLD'],
+        budgets=app.config['QUERY_BUDGETS'],
+        default_budget=app.config['QUERY_BUDGET_DEFAULT'],
+        enforce=app.config['QUERY_BUDGET_ENFORCE']
+    )
+
+@app.before_request
+def start_request_metrics():
+    # Honour an ID set by the proxy so one request can be followed across services.
+    g.request_id = request.headers.get('X-Request-ID', '')[:64] or token_hex(8)
+    g.request_started = time.perf_counter()
+    g.db_queries = 0
+    g.db_seconds = 0.0
+    if app.config['QUERY_PROFILER_ENABLED']:
+        g.query_profile = RequestProfile()
+
+@app.after_request
+def record_request_metrics(response):
+    if 'request_started' not in g:
+        return response
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    elapsed = time.perf_counter() - g.request_started
+    REQUEST_LATENCY.observe(elapsed, method=request.method, route=route, status=str(response.status_code))
+    REQUEST_DB_QUERIES.observe(g.db_queries, route=route)
+    REQUEST_DB_TIME.observe(g.db_seconds, route=route)
+    for spool in request.__dict__.get('upload_spools', ()):
+        UPLOAD_SIZE.observe(spool.bytes_written, route=route)
+    response.headers['X-Request-ID'] = g.request_id
+    logger.info("request", extra={
+        'method': request.method,
+        'path': request.path,
+        'route': route,
+        'status': response.status_code,
+        'duration_ms': round(elapsed * 1000, 1),
+        'db_queries': g.db_queries,
+        'db_ms': round(g.db_seconds * 1000, 1),
+    })
+    # Finished last, and popped first, so the profiler's own EXPLAIN statements are not counted.
+    profile = g.pop('query_profile', None)
+    if profile is not None:
+        response.headers['X-DB-Queries'] = str(len(profile.statements))
+        build_query_profiler().finish(profile, request.endpoint or 'unmatched', db.engine)
+    return response
+
+# Serving /uploads. Complaint attachments and resolution proofs are written once, so they get a
+# long-lived immutable Cache-Control; anything else (profile photos) is revalidated by ETag.
+# UPLOADS_OFFLOAD hands the byte streaming to the front-end server: 'x-sendfile' (Apache/lighttpd)
+# or 'x-accel-redirect' (nginx, with an internal location at UPLOADS_ACCEL_PREFIX aliased to uploads/).
+app.config['UPLOADS_ROOT'] = os.path.join(app.root_path, 'uploads')
+app.config['UPLOADS_IMMUTABLE_PREFIXES'] = ('blobs/', 'complaints/', 'profile/grievance/')
+app.config['UPLOADS_IMMUTABLE_MAX_AGE'] = int(os.getenv('UPLOADS_IMMUTABLE_MAX_AGE', 31536000))
+app.config['UPLOADS_OFFLOAD'] = os.getenv('UPLOADS_OFFLOAD', '')
+app.config['UPLOADS_ACCEL_PREFIX'] = os.getenv('UPLOADS_ACCEL_PREFIX', '/protected-uploads/')
+app.config['USE_X_SENDFILE'] = app.config['UPLOADS_OFFLOAD'] == 'x-sendfile'
+
+# Thumbnails for /uploads/<path>?size=small|medium are rendered on first request (or by
+# `flask thumbnails-backfill`) into a directory under uploads/ addressed by the source's SHA-256.
+# THUMBNAIL_FORMAT: 'auto' sends WebP to browsers that accept it and JPEG otherwise, or force 'webp'/'jpeg'.
+app.config['THUMBNAIL_SIZES'] = {
+    'small': int(os.getenv('THUMBNAIL_SMALL_EDGE', 320)),
+    'medium': int(os.getenv('THUMBNAIL_MEDIUM_EDGE', 960)),
+}
+app.config['THUMBNAIL_FORMAT'] = os.getenv('THUMBNAIL_FORMAT', 'auto')
+app.config['THUMBNAIL_QUALITY'] = int(os.getenv('THUMBNAIL_QUALITY', 75))
+app.config['DERIVATIVES_ROOT'] = os.path.join(app.config['UPLOADS_ROOT'], '_derivatives')
 app.secret_key = os.getenv('FLASK_SECRET_KEY', '18/07/2003ShAiKaLtHaF143@')
 
+# Prometheus metrics served on /metrics (see metrics.py). Set METRICS_TOKEN to require
+# "Authorization: Bearer <token>" on scrapes.
+app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')
+# /health reuses its last database probe for this many seconds, so frequent liveness
+# probes do not each open a connection. 0 probes on every request.
+app.config['HEALTH_DB_CHECK_TTL_SECONDS'] = float(os.getenv('HEALTH_DB_CHECK_TTL_SECONDS', 10))
+metrics_registry = MetricsRegistry()
+REQUEST_LATENCY = metrics_registry.histogram('http_request_duration_seconds', 'Request latency by route.', ('method', 'route', 'status'))
+REQUEST_DB_QUERIES = metrics_registry.histogram('http_request_db_queries', 'Database statements executed per request.', ('route',), COUNT_BUCKETS)
+REQUEST_DB_TIME = metrics_registry.histogram('http_request_db_seconds', 'Database time spent per request.', ('route',))
+DB_QUERIES = metrics_registry.counter('db_queries_total', 'Database statements executed, background work included.')
+DB_QUERY_TIME = metrics_registry.counter('db_query_seconds_total', 'Database time, background work included.')
+GEMINI_LATENCY = metrics_registry.histogram('gemini_call_duration_seconds', 'Gemini call latency, retries included, by calling function.', ('function',))
+UPLOAD_SIZE = metrics_registry.histogram('upload_size_bytes', 'Size of each uploaded file.', ('route',), SIZE_BUCKETS)
+
+# Opt-in SQL profiler for development/staging (see query_profiler.py). Flags statement shapes
+# repeated QUERY_PROFILER_REPEAT_THRESHOLD+ times in one request (N+1 candidates), EXPLAINs
+# statements slower than QUERY_PROFILER_SLOW_MS, and checks QUERY_BUDGETS
+# ("endpoint=max,endpoint=max"; QUERY_BUDGET_DEFAULT for the rest, 0 = none).
+# QUERY_BUDGET_ENFORCE turns an exceeded budget into an error, so tests driving the route fail.
+app.config['QUERY_PROFILER_ENABLED'] = os.getenv('QUERY_PROFILER_ENABLED', 'false').lower() == 'true'
+app.config['QUERY_PROFILER_SLOW_MS'] = float(os.getenv('QUERY_PROFILER_SLOW_MS', 100))
+app.config['QUERY_PROFILER_REPEAT_THRESHOLD'] = int(os.getenv('QUERY_PROFILER_REPEAT_THRESHOLD', 5))
+app.config['QUERY_BUDGETS'] = parse_budgets(os.getenv('QUERY_BUDGETS', ''))
+app.config['QUERY_BUDGET_DEFAULT'] = int(os.getenv('QUERY_BUDGET_DEFAULT', 0))
+app.config['QUERY_BUDGET_ENFORCE'] = os.getenv('QUERY_BUDGET_ENFORCE', 'false').lower() == 'true'
+
+# Point GEMINI_API_URL at a local stub server to run the app without the real model endpoint.
+GEMINI_API_URL = os.getenv('GEMINI_API_URL', "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-05-20:generateContent")
+
+gemini_client = GeminiClient(
+    GEMINI_API_URL,
+    connect_timeout=float(os.getenv('GEMINI_CONNECT_TIMEOUT', 5)),
+    read_timeout=float(os.getenv('GEMINI_READ_TIMEOUT', 30)),
+    max_retries=int(os.getenv('GEMINI_MAX_RETRIES', 2)),
+    backoff_base=float(os.getenv('GEMINI_BACKOFF_BASE', 0.5)),
+    backoff_max=float(os.getenv('GEMINI_BACKOFF_MAX', 8)),
+    breaker_threshold=int(os.getenv('GEMINI_BREAKER_THRESHOLD', 5)),
+    breaker_reset_seconds=float(os.getenv('GEMINI_BREAKER_RESET_SECONDS', 30)),
+    pool_size=int(os.getenv('GEMINI_POOL_SIZE', 10)),
+    latency_observer=lambda function, seconds: GEMINI_LATENCY.observe(seconds, function=function)
+)
+
+# TRIAGE_MODE: 'sync' classifies inline during submission, 'async' persists the grievance
+# as TRIAGE_PENDING and hands the Gemini calls to the background triage workers.
+app.config['TRIAGE_MODE'] = os.getenv('TRIAGE_MODE', 'sync')
+app.config['TRIAGE_WORKERS'] = int(os.getenv('TRIAGE_WORKERS', 4))
+app.config['TRIAGE_MAX_ATTEMPTS'] = int(os.getenv('TRIAGE_MAX_ATTEMPTS', 3))
+app.config['TRIAGE_JOB_LEASE_SECONDS'] = int(os.getenv('TRIAGE_JOB_LEASE_SECONDS', 300))
+
+# TRIAGE_CACHE_BACKEND: 'memory' (per worker), 'database' (shared table) or 'tiered' (memory in front of the table).
+app.config['TRIAGE_CACHE_BACKEND'] = os.getenv('TRIAGE_CACHE_BACKEND', 'memory')
+app.config['TRIAGE_CACHE_TTL_SECONDS'] = int(os.getenv('TRIAGE_CACHE_TTL_SECONDS', 86400))
+app.config['TRIAGE_CACHE_MAX_ENTRIES'] = int(os.getenv('TRIAGE_CACHE_MAX_ENTRIES', 2048))
+
+# SUBMISSION_TRIAGE_STRATEGY: 'combined' classifies text and scores the first photo in one
+# generateContent request; 'two_call' runs call_gemini_ai then gemini_vision_validation.
+# The combined path falls back to the two-call path whenever its response is unusable.
+app.config['SUBMISSION_TRIAGE_STRATEGY'] = os.getenv('SUBMISSION_TRIAGE_STRATEGY', 'combined')
+
+# Photos are downscaled and re-encoded before being base64-encoded for the vision/CV audit calls.
+app.config['MODEL_IMAGE_MAX_EDGE'] = int(os.getenv('MODEL_IMAGE_MAX_EDGE', 1280))
+app.config['MODEL_IMAGE_FORMAT'] = os.getenv('MODEL_IMAGE_FORMAT', 'JPEG').upper()
+app.config['MODEL_IMAGE_QUALITY'] = int(os.getenv('MODEL_IMAGE_QUALITY', 80))
+app.config['MODEL_IMAGE_PASSTHROUGH_MAX_BYTES'] = int(os.getenv('MODEL_IMAGE_PASSTHROUGH_MAX_BYTES', 4 * 1024 * 1024))
+
+# Listing APIs page with an opaque keyset cursor over (created_at, id) when a client sends
+# limit/cursor. LEGACY_UNPAGINATED_LISTINGS keeps the old full-list shape for clients that don't.
+app.config['LEGACY_UNPAGINATED_LISTINGS'] = os.getenv('LEGACY_UNPAGINATED_LISTINGS', 'true').lower() == 'true'
+app.config['LIST_PAGE_SIZE_DEFAULT'] = int(os.getenv('LIST_PAGE_SIZE_DEFAULT', 50))
+app.config['LIST_PAGE_SIZE_MAX'] = int(os.getenv('LIST_PAGE_SIZE_MAX', 200))
+
+# SERIOUSNESS_RULES: comma-separated keyword:priority pairs matched against the raw complaint text.
+# Any match makes a grievance IMMEDIATE with the highest matching priority; otherwise it is STANDARD.
+app.config['SERIOUSNESS_RULES'] = os.getenv('SERIOUSNESS_RULES', 'pothole:80,leakage:80')
+app.config['STANDARD_PRIORITY_SCORE'] = int(os.getenv('STANDARD_PRIORITY_SCORE', 20))
+
+# Complaint numbers are reserved from the complaint_sequence table in blocks of this size per worker.
+app.config['COMPLAINT_ID_BLOCK_SIZE'] = int(os.getenv('COMPLAINT_ID_BLOCK_SIZE', 20))
+
+# Draft autosaves are buffered per worker and written to the Draft table in batches at this interval.
+app.config['DRAFT_FLUSH_INTERVAL_SECONDS'] = float(os.getenv('DRAFT_FLUSH_INTERVAL_SECONDS', 5))
+
+# Every LEDGER_CHECKPOINT_INTERVAL ledger entries are rolled up into a Merkle checkpoint.
+app.config['LEDGER_CHECKPOINT_INTERVAL'] = int(os.getenv('LEDGER_CHECKPOINT_INTERVAL', 64))
+
+# LEDGER_COMMIT_MODE: 'entry' chains every resolution in its own request; 'block' hands the
+# officer a pending receipt and seals receipts in Merkle blocks of up to LEDGER_BLOCK_SIZE
+# entries, at most LEDGER_BLOCK_MAX_LATENCY_SECONDS after they were queued.
+# LEDGER_SIGNING_KEY, when set, is shared by all workers and HMAC-signs every block header.
+app.config['LEDGER_COMMIT_MODE'] = os.getenv('LEDGER_COMMIT_MODE', 'entry')
+app.config['LEDGER_BLOCK_SIZE'] = int(os.getenv('LEDGER_BLOCK_SIZE', 64))
+app.config['LEDGER_BLOCK_MAX_LATENCY_SECONDS'] = float(os.getenv('LEDGER_BLOCK_MAX_LATENCY_SECONDS', 2))
+app.config['LEDGER_SIGNING_KEY'] = os.getenv('LEDGER_SIGNING_KEY')
+
+# Public audit responses for settled records (RESOLVED, FRAUD, DELETED) are cached per worker.
+# AUDIT_CACHE_MAX_AGE_SECONDS lets browsers/CDNs reuse a response without revalidating; 0 means
+# they must revalidate every time (cheap: a matching ETag gets 304 Not Modified).
+app.config['AUDIT_CACHE_MAX_ENTRIES'] = int(os.getenv('AUDIT_CACHE_MAX_ENTRIES', 4096))
+app.config['AUDIT_CACHE_TTL_SECONDS'] = int(os.getenv('AUDIT_CACHE_TTL_SECONDS', 3600))
+app.config['AUDIT_CACHE_MAX_AGE_SECONDS'] = int(os.getenv('AUDIT_CACHE_MAX_AGE_SECONDS', 0))
+MODEL_IMAGE_MIME_TYPE = MIME_TYPES[app.config['MODEL_IMAGE_FORMAT']]
+
 db = SQLAlchemy(app)
 
 class Grievance(db.Model):
@@ -79,15 +325,29 @@ class Grievance(db.Model):
     assigned_officer_id = db.Column(db.String(50), nullable=True)
     resolved_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=db.func.now())
+    seriousness = db.Column(db.String(20))
+    priority_score = db.Column(db.Integer)
     proofs = db.relationship('ResolutionProof', backref='grievance', lazy=True)
-    attachments = db.relationship('Attachment', backref='grievance', lazy=True)
+    attachments = db.relationship('Attachment', backref='grievance', lazy=True, order_by='Attachment.id')
+    # Composite indexes matching the dashboard, listing and archive access paths (migration 002).
+    __table_args__ = (
+        db.Index('ix_grievance_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_grievance_user_status', 'user_id', 'status'),
+        db.Index('ix_grievance_officer_created', 'assigned_officer_id', 'created_at', 'id'),
+        db.Index('ix_grievance_officer_status', 'assigned_officer_id', 'status'),
+        db.Index('ix_grievance_status_created', 'status', 'created_at', 'id'),
+        db.Index('ix_grievance_status_resolved', 'status', 'resolved_at'),
+        db.Index('ix_grievance_officer_seriousness', 'assigned_officer_id', 'seriousness', 'created_at', 'id'),
+        # The deleted archive's sort key (RESOLVED_SORT_KEY), so it pages without a sort step (migration 011).
+        db.Index('ix_grievance_status_resolved_key', 'status', db.func.coalesce(resolved_at, created_at), 'id'),
+    )
 
     def __repr__(self):
         return f'<Grievance {self.complaint_id}: {self.grievance_type} - {self.status}>'
 
 class ResolutionProof(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    grievance_id = db.Column(db.Integer, db.ForeignKey('grievance.id'), nullable=False)
+    grievance_id = db.Column(db.Integer, db.ForeignKey('grievance.id'), nullable=False, index=True)
     officer_id = db.Column(db.String(50), nullable=False)
     cv_score = db.Column(db.Float) 
     is_fraudulent = db.Column(db.Boolean, default=False)
@@ -115,9 +375,14 @@ class User(db.Model):
 
 class Attachment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    grievance_id = db.Column(db.Integer, db.ForeignKey('grievance.id'), nullable=False)
+    grievance_id = db.Column(db.Integer, db.ForeignKey('grievance.id'), nullable=False, index=True)
     file_path = db.Column(db.String(255), nullable=False) 
     file_type = db.Column(db.String(50))
+    sha256 = db.Column(db.String(64), index=True)
+    dhash = db.Column(db.String(16))
+    phash = db.Column(db.String(16))
+    # Image pre-filter verdict from submission (image_prefilter.PASS/MODEL); NULL when the upload was not checked.
+    prefilter_verdict = db.Column(db.String(20))
 
 class Draft(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -143,27 +408,96 @@ class Officer(db.Model):
     def __repr__(self):
         return f'<Officer {self.officer_id}: {self.name}>'
 
+class TriageJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    grievance_id = db.Column(db.Integer, db.ForeignKey('grievance.id'), nullable=False)
+    status = db.Column(db.String(20), default='QUEUED', index=True)
+    attempts = db.Column(db.Integer, default=0)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=db.func.now())
+    updated_at = db.Column(db.DateTime, default=db.func.now())
+
+    def __repr__(self):
+        return f'<TriageJob {self.id}: Grievance {self.grievance_id} - {self.status}>'
+
+class TriageCacheEntry(db.Model):
+    cache_key = db.Column(db.String(64), primary_key=True)
+    result_json = db.Column(db.Text, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    last_used_at = db.Column(db.DateTime, default=db.func.now(), index=True)
+
+class ComplaintSequence(db.Model):
+    name = db.Column(db.String(50), primary_key=True)
+    next_value = db.Column(db.BigInteger, nullable=False)
+
+class LedgerEntry(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    sequence = db.Column(db.BigInteger, unique=True, nullable=False)
+    grievance_id = db.Column(db.Integer, db.ForeignKey('grievance.id'), nullable=False)
+    complaint_id = db.Column(db.String(255), nullable=False, index=True)
+    officer_id = db.Column(db.String(50), nullable=False)
+    cv_score = db.Column(db.Float)
+    is_fraudulent = db.Column(db.Boolean, default=False)
+    photo_sha256 = db.Column(db.String(64))
+    prev_hash = db.Column(db.String(64), nullable=False)
+    entry_hash = db.Column(db.String(64), unique=True, nullable=False)
+    recorded_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<LedgerEntry {self.sequence}: {self.entry_hash[:10]}...>'
+
+class LedgerCheckpoint(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    start_sequence = db.Column(db.BigInteger, nullable=False)
+    end_sequence = db.Column(db.BigInteger, unique=True, nullable=False)
+    merkle_root = db.Column(db.String(64), nullable=False)
+    prev_root = db.Column(db.String(64), nullable=False)
+    height = db.Column(db.BigInteger, unique=True, index=True)
+    signature = db.Column(db.String(64))
+    created_at = db.Column(db.DateTime, default=db.func.now())
+
+class LedgerReceipt(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    token = db.Column(db.String(32), unique=True, nullable=False)
+    grievance_id = db.Column(db.Integer, db.ForeignKey('grievance.id'), nullable=False)
+    complaint_id = db.Column(db.String(255), nullable=False)
+    officer_id = db.Column(db.String(50), nullable=False)
+    cv_score = db.Column(db.Float)
+    is_fraudulent = db.Column(db.Boolean, default=False)
+    photo_sha256 = db.Column(db.String(64))
+    recorded_at = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(20), default='PENDING', nullable=False, index=True)
+    entry_sequence = db.Column(db.BigInteger, nullable=True)
+    block_height = db.Column(db.BigInteger, nullable=True)
+
+class LedgerHead(db.Model):
+    name = db.Column(db.String(50), primary_key=True)
+    sequence = db.Column(db.BigInteger, nullable=False, default=0)
+    head_hash = db.Column(db.String(64), nullable=False)
+
 
 def wait_for_db(max_retries=10, delay=6):
-    print("Attempting to connect to database...")
+    logger.info("Waiting for database")
     for i in range(max_retries):
         try:
             # Attempt to execute a simple operation (like getting engine info)
             with app.app_context():
                 db.engine.connect()
-            print("Database connected successfully!")
+            logger.info("Database connected")
             return True
         except Exception as e:
-            print(f"Database connection failed (Attempt {i+1}/{max_retries}): {e}")
+            logger.warning("Database connection failed", extra={'attempt': i + 1, 'max_retries': max_retries, 'error': str(e)})
             if i < max_retries - 1:
                 time.sleep(delay)
-    print("FATAL: Database connection failed after all retries.")
+    logger.critical("Database connection failed after all retries")
     return False
 
 def init_db():
     with app.app_context():
-        db.create_all()
-        db.session.commit()
+        run_migrations(db.engine, db.metadata)
+        backfilled = backfill_seriousness()
+        if backfilled:
+            logger.info("Backfilled seriousness", extra={'grievances': backfilled})
         Officer_Model = globals().get('Officer')
         if Officer_Model and Officer_Model.query.count() == 0:
             mock_officers = [
@@ -184,29 +518,840 @@ def init_db():
             ]
             db.session.add_all(mock_officers)
             db.session.commit()
-            print("MariaDB database tables created and mock officers populated!")
+            logger.info("Database tables created and mock officers populated")
         else:
-            print("✅ Database check complete. Tables exist and officers are present.")
+            logger.info("Database check complete; tables exist and officers are present")
+        recover_triage_jobs()
+
+def parse_seriousness_rules(rules):
+    parsed = {}
+    for rule in rules.split(','):
+        keyword, _, priority = rule.strip().partition(':')
+        if keyword:
+            parsed[keyword.strip().lower()] = int(priority or 50)
+    return parsed
+
+SERIOUSNESS_RULES = parse_seriousness_rules(app.config['SERIOUSNESS_RULES'])
+
+def classify_seriousness(raw_text):
+    """Returns (seriousness, priority_score) for a complaint using the configured keyword rules."""
+    text_lower = (raw_text or "").lower()
+    matched = [priority for keyword, priority in SERIOUSNESS_RULES.items() if keyword in text_lower]
+    if matched:
+        return 'IMMEDIATE', max(matched)
+    return 'STANDARD', app.config['STANDARD_PRIORITY_SCORE']
+
+def backfill_seriousness(batch_size=500, recompute=False):
+    """Fills seriousness/priority_score in id-ordered batches; recompute=True re-applies changed rules to every row."""
+    last_id = 0
+    updated = 0
+    while True:
+        query = db.session.query(Grievance.id, Grievance.raw_text).filter(Grievance.id > last_id)
+        if not recompute:
+            query = query.filter(Grievance.seriousness.is_(None))
+        rows = query.order_by(Grievance.id).limit(batch_size).all()
+        if not rows:
+            break
+        changes = []
+        for row in rows:
+            seriousness, priority_score = classify_seriousness(row.raw_text)
+            changes.append({'id': row.id, 'seriousness': seriousness, 'priority_score': priority_score})
+        db.session.execute(update(Grievance), changes)
+        db.session.commit()
+        updated += len(changes)
+        last_id = rows[-1].id
+    return updated
+
+@app.cli.command('backfill-seriousness')
+@click.option('--batch-size', default=500, show_default=True)
+@click.option('--recompute', is_flag=True, help='Reclassify every grievance, e.g. after changing SERIOUSNESS_RULES.')
+def backfill_seriousness_command(batch_size, recompute):
+    """Stores seriousness and priority_score for grievances created before they were computed at intake."""
+    with app.app_context():
+        updated = backfill_seriousness(batch_size, recompute)
+    print(f"Classified {updated} grievance(s).")
+
+def stream_grievance_batches(columns, statuses, after_id, batch_size):
+    """
+    Yields lists of grievance rows with id > after_id in id order. Uses a server-side cursor on
+    its own connection where the driver has one; elsewhere (SQLite) it pages by id, since an open
+    SQLite cursor would block the writes made between batches.
+    """
+    query = select(*columns).where(Grievance.status.in_(statuses)).order_by(Grievance.id)
+    if db.engine.dialect.supports_server_side_cursors:
+        with db.engine.connect() as reader:
+            result = reader.execution_options(stream_results=True, yield_per=batch_size).execute(query.where(Grievance.id > after_id))
+            yield from result.partitions()
+        return
+    while True:
+        with db.engine.connect() as reader:
+            batch = reader.execute(query.where(Grievance.id > after_id).limit(batch_size)).all()
+        if not batch:
+            return
+        yield batch
+        after_id = batch[-1].id
+
+def retriage_grievances(statuses, batch_size, workers, rate, dry_run, checkpoint_path, restart=False, report=None):
+    """
+    Re-runs triage for grievances in `statuses` under the current TRIAGE_PROMPT_VERSION.
+    Rows are streamed in batches (see stream_grievance_batches), triaged on a thread pool
+    and written back one bulk update per batch. Returns the checkpoint state with the run's counters.
+    """
+    run_key = f"{TRIAGE_PROMPT_VERSION}:{','.join(sorted(statuses))}:{'dry-run' if dry_run else 'apply'}"
+    state = None if restart else load_checkpoint(checkpoint_path, run_key)
+    if state is None:
+        state = {'run_key': run_key, 'last_id': 0, 'done': False, 'counts': {'triaged': 0, 'changed': 0, 'unchanged': 0, 'failed': 0}}
+    elif state['done']:
+        print("The checkpoint shows this run already completed; pass --restart to run it again.")
+        return state
+    else:
+        print(f"Resuming after grievance id {state['last_id']}.")
+    counts = state['counts']
+    limiter = RateLimiter(rate)
+
+    def triage_row(row):
+        limiter.acquire()
+        with app.app_context():
+            return row, call_gemini_ai(row.raw_text, row.location_tag)
+
+    columns = [Grievance.id, Grievance.complaint_id, Grievance.raw_text, Grievance.location_tag]
+    columns += [getattr(Grievance, column) for column in TRIAGE_FIELDS.values()]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for batch in stream_grievance_batches(columns, statuses, state['last_id'], batch_size):
+            updates = []
+            for row, ai_results in pool.map(triage_row, batch):
+                counts['triaged'] += 1
+                # Fallback answers (no raw_text_processed) would overwrite good data with placeholders.
+                if 'Error' in ai_results['classification'] or 'raw_text_processed' not in ai_results:
+                    counts['failed'] += 1
+                    continue
+                changes = triage_changes(row, ai_results)
+                if not changes:
+                    counts['unchanged'] += 1
+                    continue
+                counts['changed'] += 1
+                updates.append({'id': row.id, **{column: new for column, (_, new) in changes.items()}})
+                if report:
+                    report.write(json.dumps({
+                        'complaint_id': row.complaint_id,
+                        'changes': {column: {'old': old, 'new': new} for column, (old, new) in changes.items()},
+                    }) + "\n")
+                routing = [f"{column} {old!r} -> {new!r}" for column, (old, new) in changes.items() if column in ('grievance_type', 'assigned_officer_id')]
+                if routing:
+                    print(f"  {row.complaint_id}: {'; '.join(routing)}")
+            if updates and not dry_run:
+                db.session.execute(update(Grievance), updates)
+                db.session.commit()
+            state['last_id'] = batch[-1].id
+            save_checkpoint(checkpoint_path, state)
+    state['done'] = True
+    save_checkpoint(checkpoint_path, state)
+    return state
+
+@app.cli.command('retriage')
+@click.option('--status', 'statuses', default='PENDING', show_default=True, help='Comma-separated grievance statuses to re-triage.')
+@click.option('--batch-size', default=200, show_default=True, help='Rows fetched and written back per batch.')
+@click.option('--workers', default=4, show_default=True, help='Concurrent triage calls.')
+@click.option('--rate', default=5.0, show_default=True, help='Maximum triage calls per second (0 for no limit).')
+@click.option('--dry-run', is_flag=True, help='Report what would change without writing.')
+@click.option('--report', type=click.File('w'), default=None, help='Write every change as a JSON line (old and new values).')
+@click.option('--checkpoint', 'checkpoint_path', default='retriage-checkpoint.json', show_default=True)
+@click.option('--restart', is_flag=True, help='Ignore the checkpoint and start from the first grievance.')
+def retriage_command(statuses, batch_size, workers, rate, dry_run, report, checkpoint_path, restart):
+    """Re-runs triage on stored grievances after a change to the triage prompt or categories."""
+    with app.app_context():
+        state = retriage_grievances(
+            [s.strip() for s in statuses.split(',')], batch_size, workers, rate,
+            dry_run, checkpoint_path, restart, report
+        )
+    counts = state['counts']
+    print(f"Triaged {counts['triaged']} grievance(s) with prompt {TRIAGE_PROMPT_VERSION}: "
+          f"{counts['changed']} {'would change' if dry_run else 'changed'}, {counts['unchanged']} unchanged, {counts['failed']} failed.")
+    if counts['failed']:
+        print("Failed rows keep their previous triage; run again with --restart to retry them.")
+
+def append_ledger_entry(grievance, officer_id, cv_score, is_fraudulent, photo_sha256, recorded_at):
+    """
+    Chains a resolution onto the ledger inside the caller's transaction.
+    The head row is locked FOR UPDATE, so concurrent resolutions append one at a time.
+    """
+    head = db.session.query(LedgerHead).filter_by(name='main').with_for_update().one()
+    sequence = head.sequence + 1
+    entry_hash = compute_entry_hash(
+        head.head_hash, sequence, grievance.complaint_id, officer_id, cv_score, is_fraudulent, photo_sha256, recorded_at
+    )
+    entry = LedgerEntry(
+        sequence=sequence,
+        grievance_id=grievance.id,
+        complaint_id=grievance.complaint_id,
+        officer_id=officer_id,
+        cv_score=cv_score,
+        is_fraudulent=is_fraudulent,
+        photo_sha256=photo_sha256,
+        prev_hash=head.head_hash,
+        entry_hash=entry_hash,
+        recorded_at=recorded_at
+    )
+    db.session.add(entry)
+    head.sequence = sequence
+    head.head_hash = entry_hash
+
+    if sequence % app.config['LEDGER_CHECKPOINT_INTERVAL'] == 0:
+        db.session.flush()
+        write_ledger_checkpoint(sequence)
+    return entry
+
+def ledger_window_hashes(start_sequence, end_sequence):
+    rows = db.session.query(LedgerEntry.entry_hash).filter(
+        LedgerEntry.sequence.between(start_sequence, end_sequence)
+    ).order_by(LedgerEntry.sequence).all()
+    return [row.entry_hash for row in rows]
+
+def write_ledger_checkpoint(end_sequence, entry_hashes=None):
+    """Rolls every entry after the previous checkpoint up to `end_sequence` into the next (signed) checkpoint."""
+    previous = LedgerCheckpoint.query.order_by(LedgerCheckpoint.end_sequence.desc()).first()
+    start_sequence = previous.end_sequence + 1 if previous else 1
+    height = previous.height + 1 if previous else 1
+    prev_root = previous.merkle_root if previous else GENESIS_HASH
+    # Entries chained since the last checkpoint (e.g. before a switch to block mode) belong to this one too.
+    if entry_hashes is None or len(entry_hashes) < end_sequence - start_sequence + 1:
+        entry_hashes = ledger_window_hashes(start_sequence, end_sequence)
+    root = merkle_root(entry_hashes)
+    checkpoint = LedgerCheckpoint(
+        start_sequence=start_sequence,
+        end_sequence=end_sequence,
+        merkle_root=root,
+        prev_root=prev_root,
+        height=height,
+        signature=block_signature(app.config['LEDGER_SIGNING_KEY'], height, start_sequence, end_sequence, root, prev_root)
+    )
+    db.session.add(checkpoint)
+    return checkpoint
+
+def pending_proof_hash(receipt_token):
+    return f"PENDING:{receipt_token}"
+
+def record_ledger_resolution(grievance, officer_id, cv_score, is_fraudulent, photo_sha256, recorded_at):
+    """
+    Adds a resolution to the ledger inside the caller's transaction and returns (proof_hash, receipt).
+    In block mode only a receipt is written: proof_hash is a placeholder that seal_ledger_block
+    replaces with the entry hash, and the caller must notify ledger_block_builder after committing.
+    """
+    if app.config['LEDGER_COMMIT_MODE'] != 'block':
+        entry = append_ledger_entry(grievance, officer_id, cv_score, is_fraudulent, photo_sha256, recorded_at)
+        return entry.entry_hash, None
+    receipt = LedgerReceipt(
+        token=token_hex(16),
+        grievance_id=grievance.id,
+        complaint_id=grievance.complaint_id,
+        officer_id=officer_id,
+        cv_score=cv_score,
+        is_fraudulent=is_fraudulent,
+        photo_sha256=photo_sha256,
+        recorded_at=recorded_at,
+        status='PENDING'
+    )
+    db.session.add(receipt)
+    return pending_proof_hash(receipt.token), receipt
+
+def seal_ledger_block(max_entries):
+    """Chains up to `max_entries` pending receipts onto the ledger as one block in one transaction. Returns the count sealed."""
+    try:
+        head = db.session.query(LedgerHead).filter_by(name='main').with_for_update().one()
+        pending = LedgerReceipt.query.filter_by(status='PENDING').order_by(LedgerReceipt.id).limit(max_entries).all()
+        if not pending:
+            db.session.rollback()
+            return 0
+        entry_hashes = []
+        proof_updates = []
+        for receipt in pending:
+            sequence = head.sequence + 1
+            entry_hash = compute_entry_hash(
+                head.head_hash, sequence, receipt.complaint_id, receipt.officer_id,
+                receipt.cv_score, receipt.is_fraudulent, receipt.photo_sha256, receipt.recorded_at
+            )
+            db.session.add(LedgerEntry(
+                sequence=sequence,
+                grievance_id=receipt.grievance_id,
+                complaint_id=receipt.complaint_id,
+                officer_id=receipt.officer_id,
+                cv_score=receipt.cv_score,
+                is_fraudulent=receipt.is_fraudulent,
+                photo_sha256=receipt.photo_sha256,
+                prev_hash=head.head_hash,
+                entry_hash=entry_hash,
+                recorded_at=receipt.recorded_at
+            ))
+            head.sequence = sequence
+            head.head_hash = entry_hash
+            receipt.status = 'COMMITTED'
+            receipt.entry_sequence = sequence
+            entry_hashes.append(entry_hash)
+            proof_updates.append({'placeholder': pending_proof_hash(receipt.token), 'entry_hash': entry_hash})
+
+        db.session.flush()
+        block = write_ledger_checkpoint(head.sequence, entry_hashes)
+        for receipt in pending:
+            receipt.block_height = block.height
+        proofs = ResolutionProof.__table__
+        db.session.execute(
+            proofs.update().where(proofs.c.proof_hash == bindparam('placeholder')).values(proof_hash=bindparam('entry_hash')),
+            proof_updates
+        )
+        db.session.commit()
+        return len(pending)
+    except Exception:
+        db.session.rollback()
+        raise
+
+def receipt_payload(receipt):
+    payload = {
+        "receipt_id": receipt.token,
+        "complaint_id": receipt.complaint_id,
+        "status": receipt.status,
+        "block_height": receipt.block_height,
+        "poll_url": url_for('ledger_receipt_status', receipt_token=receipt.token)
+    }
+    if receipt.status == 'COMMITTED':
+        entry = LedgerEntry.query.filter_by(sequence=receipt.entry_sequence).first()
+        payload["entry_sequence"] = receipt.entry_sequence
+        payload["entry_hash"] = entry.entry_hash
+        payload["inclusion"] = ledger_inclusion_proof(entry)
+    return payload
+
+def ledger_inclusion_proof(entry):
+    """Merkle path proving `entry` is in its checkpoint, or a pending marker if its window is still open."""
+    checkpoint = LedgerCheckpoint.query.filter(
+        LedgerCheckpoint.start_sequence <= entry.sequence,
+        LedgerCheckpoint.end_sequence >= entry.sequence
+    ).first()
+    if not checkpoint:
+        return {"status": "PENDING_CHECKPOINT"}
+    window = ledger_window_hashes(checkpoint.start_sequence, checkpoint.end_sequence)
+    proof = merkle_proof(window, entry.sequence - checkpoint.start_sequence)
+    return {
+        "status": "CHECKPOINTED",
+        "block_height": checkpoint.height,
+        "checkpoint_range": [checkpoint.start_sequence, checkpoint.end_sequence],
+        "merkle_root": checkpoint.merkle_root,
+        "proof": proof,
+        "verified": verify_merkle_proof(entry.entry_hash, proof, checkpoint.merkle_root)
+    }
+
+def verify_ledger(from_sequence=1, batch_size=1000):
+    """Streams the ledger from `from_sequence` through a ChainVerifier and checks it ends at the stored head."""
+    prev_hash = GENESIS_HASH
+    if from_sequence > 1:
+        anchor = LedgerEntry.query.filter_by(sequence=from_sequence - 1).first()
+        if not anchor:
+            raise ValueError(f"No ledger entry {from_sequence - 1} to anchor verification.")
+        prev_hash = anchor.entry_hash
+    checkpoints = LedgerCheckpoint.query.filter(LedgerCheckpoint.end_sequence >= from_sequence).all()
+    verifier = ChainVerifier(checkpoints, start_sequence=from_sequence, prev_hash=prev_hash, signing_key=app.config['LEDGER_SIGNING_KEY'])
+    entries = LedgerEntry.query.filter(LedgerEntry.sequence >= from_sequence).order_by(LedgerEntry.sequence)
+    for entry in entries.yield_per(batch_size):
+        verifier.feed(entry)
+    head = db.session.get(LedgerHead, 'main')
+    if head and head.head_hash != verifier.last_hash:
+        verifier.errors.append("Ledger head does not match the last entry in the chain.")
+    return verifier
+
+@app.cli.command('thumbnails-backfill')
+@click.option('--sizes', default=None, help='Comma-separated size names (default: every configured size).')
+@click.option('--formats', default='webp,jpeg', show_default=True, help='Comma-separated output formats.')
+def thumbnails_backfill_command(sizes, formats):
+    """Renders thumbnails for every image already under uploads/."""
+    size_names = sizes.split(',') if sizes else list(app.config['THUMBNAIL_SIZES'])
+    image_formats = ['JPEG' if f.strip().upper() in ('JPG', 'JPEG') else f.strip().upper() for f in formats.split(',')]
+    derivatives_root = app.config['DERIVATIVES_ROOT']
+    created = existing = not_images = 0
+    for dirpath, dirnames, filenames in os.walk(app.config['UPLOADS_ROOT']):
+        dirnames[:] = [d for d in dirnames if os.path.join(dirpath, d) != derivatives_root]
+        for name in filenames:
+            source_path = os.path.join(dirpath, name)
+            if not is_servable_upload(source_path):
+                continue
+            source_sha256 = upload_etag(source_path, os.stat(source_path))
+            try:
+                for size_name in size_names:
+                    for image_format in image_formats:
+                        rendered = ensure_derivative(
+                            source_path, derivative_path(derivatives_root, source_sha256, size_name, image_format),
+                            app.config['THUMBNAIL_SIZES'][size_name], image_format, app.config['THUMBNAIL_QUALITY']
+                        )
+                        if rendered:
+                            created += 1
+                        else:
+                            existing += 1
+            except DECODE_ERRORS:
+                not_images += 1
+    print(f"Rendered {created} thumbnail(s); {existing} already existed; skipped {not_images} non-image file(s).")
+
+@app.cli.command('blobs-gc')
+@click.option('--dry-run', is_flag=True, help='Only report what would be removed.')
+@click.option('--legacy', is_flag=True, help='Also remove pre-blob-store attachment files no Attachment points at.')
+@click.option('--grace-minutes', default=60, show_default=True, help='Leave files modified more recently than this alone.')
+def blobs_gc_command(dry_run, legacy, grace_minutes):
+    """Removes attachment files that no Attachment row references."""
+    # Files are listed before references are read, and recent files are skipped:
+    # an upload stores its blob (or touches an existing one) before its
+    # Attachment row commits, and must not be collected in between.
+    stale_before = time.time() - grace_minutes * 60
+    candidates = list(blob_store.iter_blobs())
+    if legacy:
+        for legacy_dir in (os.path.join(app.config['UPLOAD_FOLDER'], 'grievance'), app.config['COMPLAINT_UPLOAD_FOLDER']):
+            for dirpath, _, filenames in os.walk(legacy_dir):
+                candidates.extend(os.path.join(dirpath, name) for name in filenames)
+    # Leftover temp files from interrupted writes.
+    for dirpath, _, filenames in os.walk(blob_store.root):
+        candidates.extend(os.path.join(dirpath, name) for name in filenames if name.endswith('.tmp'))
+    with app.app_context():
+        referenced = {attachment_file(row.file_path) for row in db.session.query(Attachment.file_path).distinct()}
+
+    removed = freed = 0
+    for path in candidates:
+        if app_path(path) in referenced:
+            continue
+        try:
+            if os.path.getmtime(path) >= stale_before:
+                continue
+        except FileNotFoundError:
+            continue
+        removed += 1
+        freed += os.path.getsize(path)
+        if not dry_run:
+            blob_store.delete(path)
+    action = "Would remove" if dry_run else "Removed"
+    print(f"{action} {removed} unreferenced file(s), {freed / (1024 * 1024):.1f} MB.")
+
+@app.cli.command('photo-fingerprints-backfill')
+@click.option('--batch-size', default=200, show_default=True, help='Attachments fingerprinted per commit.')
+def photo_fingerprints_backfill_command(batch_size):
+    """Computes perceptual hashes for attachments stored before the duplicate index existed (picked up by workers on restart)."""
+    fingerprinted = unreadable = 0
+    last_id = 0
+    with app.app_context():
+        while True:
+            batch = Attachment.query.filter(Attachment.id > last_id, Attachment.dhash.is_(None)).order_by(Attachment.id).limit(batch_size).all()
+            if not batch:
+                break
+            for attachment in batch:
+                last_id = attachment.id
+                fingerprint = None
+                source_path = attachment_file(attachment.file_path)
+                if os.path.isfile(source_path):
+                    with open(source_path, 'rb') as f:
+                        fingerprint = image_fingerprint(f)
+                if fingerprint is None:
+                    unreadable += 1
+                    continue
+                attachment.dhash = fingerprint_to_hex(fingerprint[0])
+                attachment.phash = fingerprint_to_hex(fingerprint[1])
+                fingerprinted += 1
+            db.session.commit()
+    print(f"Fingerprinted {fingerprinted} attachment(s); {unreadable} missing or not images.")
+
+@app.cli.command('ledger-verify')
+@click.option('--from-sequence', default=1, show_default=True, help='Verify only entries from this sequence onward.')
+def ledger_verify_command(from_sequence):
+    """Re-hashes the resolution ledger and checks every link and checkpoint root."""
+    with app.app_context():
+        verifier = verify_ledger(from_sequence)
+    print(f"Checked {verifier.entries_checked} entries and {verifier.checkpoints_checked} checkpoints.")
+    for error in verifier.errors:
+        print(f"  {error}")
+    if not verifier.ok:
+        raise SystemExit(1)
+
+@app.cli.command('db-upgrade')
+def db_upgrade_command():
+    """Applies pending schema migrations."""
+    with app.app_context():
+        applied = run_migrations(db.engine, db.metadata)
+    print(f"Applied {len(applied)} migration(s)." if applied else "Schema is up to date.")
+
+def hot_grievance_queries():
+    """The dashboard/listing access paths paired with the index each one is expected to use."""
+    return [
+        ('citizen listing', db.select(Grievance).filter_by(user_id='USER0000').order_by(Grievance.created_at.desc()), 'ix_grievance_user_created'),
+        ('citizen status filter', db.select(Grievance).filter_by(user_id='USER0000', status='PENDING'), 'ix_grievance_user_status'),
+        ('officer listing', db.select(Grievance).filter_by(assigned_officer_id='ENG_001').order_by(Grievance.created_at.desc()), 'ix_grievance_officer_created'),
+        ('officer status filter', db.select(Grievance).filter_by(assigned_officer_id='ENG_001', status='RESOLVED'), 'ix_grievance_officer_status'),
+        ('officer seriousness filter', db.select(Grievance).filter_by(assigned_officer_id='ENG_001', seriousness='IMMEDIATE').order_by(Grievance.created_at.desc()), 'ix_grievance_officer_seriousness'),
+        ('deleted archive', db.select(Grievance).filter_by(status='DELETED').order_by(RESOLVED_SORT_KEY[0].desc(), Grievance.id.desc()), 'ix_grievance_status_resolved_key'),
+        ('proof lookup', db.select(ResolutionProof).filter_by(grievance_id=1), 'ix_resolution_proof_grievance_id'),
+        ('attachment lookup', db.select(Attachment).filter_by(grievance_id=1), 'ix_attachment_grievance_id'),
+    ]
+
+@app.cli.command('db-explain')
+def db_explain_command():
+    """EXPLAINs the hot grievance queries and exits non-zero if any of them skips its index."""
+    with app.app_context():
+        results = check_index_usage(db.engine, hot_grievance_queries())
+    for result in results:
+        print(f"[{'OK' if result['uses_index'] else 'MISSING'}] {result['query']} -> {result['expected_index']}")
+        for line in result['plan']:
+            print(f"    {line}")
+    if not all(result['uses_index'] for result in results):
+        raise SystemExit(1)
 
 def generate_user_id(aadhar, name):
     date_str = datetime.now().strftime("%Y%m%d")
     name_initials = "".join(n[0] for n in name.split()).upper()[:5] 
     return f"USER{aadhar[-4:]}{name_initials}{date_str}"
 
-def generate_complaint_id(aadhar, complaint_count):
-    date_str = datetime.now().strftime("%Y%m%d")
-    count_str = str(complaint_count + 1).zfill(3) 
-    return f"COMPLAINT{aadhar[-4:]}{date_str}{count_str}"
+complaint_number_lock = threading.Lock()
+complaint_number_block = {'next': 0, 'end': 0}
+
+def reserve_complaint_numbers(block_size):
+    """
+    Atomically advances the shared counter by block_size and returns the reserved [start, end) range.
+    The UPDATE row-locks the counter until commit, so blocks handed to different workers never overlap.
+    """
+    sequence = ComplaintSequence.__table__
+    with db.engine.begin() as conn:
+        conn.execute(
+            update(sequence)
+            .where(sequence.c.name == 'complaint')
+            .values(next_value=sequence.c.next_value + block_size)
+        )
+        end = conn.execute(select(sequence.c.next_value).where(sequence.c.name == 'complaint')).scalar_one()
+    return end - block_size, end
+
+def next_complaint_number():
+    with complaint_number_lock:
+        if complaint_number_block['next'] >= complaint_number_block['end']:
+            start, end = reserve_complaint_numbers(app.config['COMPLAINT_ID_BLOCK_SIZE'])
+            complaint_number_block['next'], complaint_number_block['end'] = start, end
+        number = complaint_number_block['next']
+        complaint_number_block['next'] += 1
+        return number
+
+def generate_complaint_id(aadhar):
+    # The fixed-width prefix plus a globally unique number keeps IDs collision-free in the existing format.
+    return f"COMPLAINT{aadhar[-4:]}{datetime.now().strftime('%Y%m%d%H%M%S')}{next_complaint_number()}"
+
+def resolution_seconds_expr():
+    """Seconds between created_at and resolved_at, spelled for the active database dialect."""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return func.extract('epoch', Grievance.resolved_at - Grievance.created_at)
+    if dialect == 'sqlite':
+        return (func.julianday(Grievance.resolved_at) - func.julianday(Grievance.created_at)) * 86400
+    return func.timestampdiff(db.text('SECOND'), Grievance.created_at, Grievance.resolved_at)
+
+def grievance_kpis(*criteria):
+    """Status counts and average resolution time for the matching grievances in a single aggregate query."""
+    is_resolved = Grievance.status == 'RESOLVED'
+    row = db.session.query(
+        func.count(Grievance.id).label('total'),
+        func.sum(case((is_resolved, 1), else_=0)).label('resolved'),
+        func.sum(case((Grievance.status == 'PENDING', 1), else_=0)).label('pending'),
+        func.sum(case((Grievance.status == 'REOPENED', 1), else_=0)).label('reopened'),
+        func.sum(case((Grievance.status == 'FRAUD', 1), else_=0)).label('fraud'),
+        func.avg(case((is_resolved & Grievance.resolved_at.isnot(None), resolution_seconds_expr()), else_=None)).label('avg_resolution_seconds')
+    ).filter(*criteria).one()
+    return {
+        'total': row.total or 0,
+        'resolved': int(row.resolved or 0),
+        'pending': int(row.pending or 0),
+        'reopened': int(row.reopened or 0),
+        'fraud': int(row.fraud or 0),
+        'avg_resolution_days': round(float(row.avg_resolution_seconds) / 86400, 1) if row.avg_resolution_seconds is not None else 0
+    }
+
+# Sort keys a listing can page on: the SQL expression and the same value read off a loaded row.
+# Soft-deleted grievances sort by resolution time; rows resolved before resolved_at was always
+# recorded fall back to created_at, so the key is never NULL.
+CREATED_SORT_KEY = (Grievance.created_at, lambda g: g.created_at)
+RESOLVED_SORT_KEY = (func.coalesce(Grievance.resolved_at, Grievance.created_at), lambda g: g.resolved_at or g.created_at)
+
+def encode_cursor(grievance, sort_key=CREATED_SORT_KEY):
+    sort_value = sort_key[1](grievance)
+    cursor_data = json.dumps([sort_value.isoformat() if sort_value is not None else None, grievance.id])
+    return base64.urlsafe_b64encode(cursor_data.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    try:
+        sort_value, grievance_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        if sort_value is None:
+            raise ValueError
+        return datetime.fromisoformat(sort_value), int(grievance_id)
+    except Exception:
+        raise ValueError("Invalid pagination cursor.")
+
+def pagination_requested():
+    return 'limit' in request.args or 'cursor' in request.args or not app.config['LEGACY_UNPAGINATED_LISTINGS']
+
+def paginate_grievances(query, descending=True, sort_key=CREATED_SORT_KEY):
+    """
+    Keyset pagination on (sort key, id) driven by the limit/cursor query args.
+    The sort key must be a non-null datetime; the cursor carries its value.
+    Returns (grievances, next_cursor); next_cursor is None on the last page.
+    Raises ValueError for a malformed cursor or limit.
+    """
+    try:
+        limit = int(request.args.get('limit', app.config['LIST_PAGE_SIZE_DEFAULT']))
+    except ValueError:
+        raise ValueError("limit must be an integer.")
+    limit = max(1, min(limit, app.config['LIST_PAGE_SIZE_MAX']))
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        position = decode_cursor(cursor)
+        sort_column = sort_key[0]
+        key = tuple_(sort_column, Grievance.id)
+        query = query.filter(key < position if descending else key > position)
+    if descending:
+        query = query.order_by(sort_key[0].desc(), Grievance.id.desc())
+    else:
+        query = query.order_by(sort_key[0].asc(), Grievance.id.asc())
+
+    rows = query.limit(limit + 1).all()
+    next_cursor = encode_cursor(rows[limit - 1], sort_key) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+# Large TEXT columns a list view can leave out with ?fields=; they are deferred in SQL when not requested.
+LARGE_TEXT_FIELDS = {
+    'raw_text': Grievance.raw_text,
+    'professional_text': Grievance.professional_text,
+}
+
+def requested_fields():
+    """The ?fields= projection as a set (always including id), or None when every field is wanted."""
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return {field.strip() for field in fields.split(',') if field.strip()} | {'id'}
+
+def apply_field_projection(query, fields):
+    if fields is None:
+        return query
+    for field, column in LARGE_TEXT_FIELDS.items():
+        if field not in fields:
+            query = query.options(defer(column))
+    return query
+
+def serialize_grievance(grievance, serializers, fields=None):
+    return {key: serialize(grievance) for key, serialize in serializers.items() if fields is None or key in fields}
+
+def format_timestamp(value):
+    return value.strftime("%Y-%m-%d %H:%M:%S") if value else "N/A"
+
+def attachment_list(grievance):
+    return [{'id': a.id, 'file_path': attachment_public_path(a.file_path), 'file_type': a.file_type} for a in grievance.attachments]
+
+CITIZEN_GRIEVANCE_FIELDS = {
+    'id': lambda g: g.id,
+    'complaint_id': lambda g: g.complaint_id,
+    'type': lambda g: g.grievance_type,
+    'raw_text': lambda g: g.raw_text,
+    'professional_text': lambda g: g.professional_text,
+    'location': lambda g: g.location_tag,
+    'status': lambda g: g.status,
+    'created_at': lambda g: format_timestamp(g.created_at),
+    'attachments': attachment_list,
+}
+
+OFFICER_GRIEVANCE_FIELDS = {
+    'id': lambda g: g.id,
+    'complaint_id': lambda g: g.complaint_id,
+    'grievance_type': lambda g: g.grievance_type,
+    'location_tag': lambda g: g.location_tag,
+    'raw_text': lambda g: g.raw_text,
+    'professional_text': lambda g: g.professional_text,
+    'status': lambda g: g.status,
+    'seriousness': lambda g: g.seriousness,
+    'priority_score': lambda g: g.priority_score,
+    'created_at': lambda g: format_timestamp(g.created_at),
+    'attachment_path': lambda g: attachment_public_path(g.attachments[0].file_path) if g.attachments else None,
+}
+
+DELETED_GRIEVANCE_FIELDS = {
+    'id': lambda g: g.id,
+    'complaint_id': lambda g: g.complaint_id,
+    'grievance_type': lambda g: g.grievance_type,
+    'professional_text': lambda g: g.professional_text,
+    'resolved_at': lambda g: format_timestamp(g.resolved_at),
+}
 
 def image_to_base64(file):
-    file.seek(0)
-    return base64.b64encode(file.read()).decode('utf-8')
+    return encode_image_for_model(
+        file,
+        max_edge=app.config['MODEL_IMAGE_MAX_EDGE'],
+        image_format=app.config['MODEL_IMAGE_FORMAT'],
+        quality=app.config['MODEL_IMAGE_QUALITY'],
+        passthrough_max_bytes=app.config['MODEL_IMAGE_PASSTHROUGH_MAX_BYTES']
+    )
 
 def calculate_dlt_hash(grievance_id, officer_id, cv_score, timestamp):
     data_string = f"{grievance_id}-{officer_id}-{cv_score}-{timestamp}"
     return hashlib.sha256(data_string.encode('utf-8')).hexdigest()
 
+# Triage persona and output schema. TRIAGE_PROMPT_VERSION changes whenever either does,
+# which retires every cached triage result produced under the old prompt.
+TRIAGE_SYSTEM_INSTRUCTION = (
+    "You are a highly efficient, multilingual Grievance Triage Agent for the AP Government's "
+    "RTGS system. Your task is to analyze raw citizen complaints (which may include Telugu "
+    "written in English script or code-switching), provide a specific classification, "
+    "translate/transliterate the raw text for clarity, and output a professional, "
+    "actionable summary for the concerned department head in a precise JSON format. "
+    "The classification must be one of: 'Road Maintenance (Pothole)', 'Water Supply & Leakage', "
+    "'Stray Dog Menace', 'Electrical (Streetlight Outage)', or 'General Municipal Service'. "
+    "Assign the Department ID based on the classification: ENG_001 (Engineering/Roads/Electric), "
+    "WTR_002 (Water), HIN_002 (Health/Nuisance), or ADM_003 (General/Admin)."
+)
+
+TRIAGE_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "classification": {"type": "STRING", "description": "The specific category of the grievance."},
+        "department_id": {"type": "STRING", "description": "The target department ID based on the classification."},
+        "raw_text_processed": {"type": "STRING", "description": "The original citizen text translated/cleaned for clarity (e.g., Telugu transliteration into English or clean Telugu script)."},
+        "professional_text": {"type": "STRING", "description": "A formal, concise summary of the issue ready for the officer's report."}
+    },
+    "required": ["classification", "department_id", "raw_text_processed", "professional_text"]
+}
+
+TRIAGE_PROMPT_VERSION = hashlib.sha256(
+    json.dumps([TRIAGE_SYSTEM_INSTRUCTION, TRIAGE_RESPONSE_SCHEMA], sort_keys=True).encode('utf-8')
+).hexdigest()[:12]
+
+triage_cache = build_triage_cache(
+    app.config['TRIAGE_CACHE_BACKEND'],
+    db=db,
+    model=TriageCacheEntry,
+    ttl=app.config['TRIAGE_CACHE_TTL_SECONDS'],
+    max_entries=app.config['TRIAGE_CACHE_MAX_ENTRIES']
+)
+
+draft_store = DraftStore(app, db, Draft, flush_interval=app.config['DRAFT_FLUSH_INTERVAL_SECONDS'])
+
+blob_store = BlobStore(app.config['BLOB_STORE_ROOT'])
+
+def store_attachment(grievance, file, file_type=None, fingerprint=None, prefilter_verdict=None):
+    """Writes an upload into the blob store and adds its Attachment row; returns the Attachment."""
+    if fingerprint is None:
+        fingerprint = image_fingerprint(file)
+    file.seek(0)
+    blob_path, sha256, _ = blob_store.put_file(file, blob_extension(file.filename, file.content_type))
+    attachment = Attachment(
+        grievance_id=grievance.id,
+        file_path=blob_store.key_for(blob_path),
+        file_type=file_type or file.content_type,
+        sha256=sha256,
+        dhash=fingerprint_to_hex(fingerprint[0]) if fingerprint else None,
+        phash=fingerprint_to_hex(fingerprint[1]) if fingerprint else None,
+        prefilter_verdict=prefilter_verdict
+    )
+    db.session.add(attachment)
+    return attachment
+
+def store_submission_attachments(grievance, files, photo_check=None):
+    """Stores a complaint's uploads; the first one keeps the pre-filter verdict and fingerprint it was checked with."""
+    uploads = [file for file in files if file.filename]
+    for index, file in enumerate(uploads):
+        if index == 0 and photo_check and file is photo_check['file']:
+            store_attachment(grievance, file, fingerprint=photo_check['fingerprint'], prefilter_verdict=photo_check['verdict'])
+        else:
+            store_attachment(grievance, file)
+
+def load_photo_fingerprints(after_id):
+    return db.session.query(
+        Attachment.id, Attachment.grievance_id, Attachment.file_type, Attachment.dhash, Attachment.phash
+    ).filter(Attachment.id > after_id, Attachment.dhash.isnot(None)).order_by(Attachment.id).all()
+
+photo_index = PerceptualIndex(load_photo_fingerprints, max_distance=app.config['IMAGE_DUPLICATE_MAX_DISTANCE'])
+
+def find_reused_photo(file, fingerprint):
+    """
+    Earlier attachment this upload duplicates, or None: the same bytes (by blob hash),
+    or a perceptual near-duplicate from the photo index.
+    """
+    exact = db.session.query(Attachment.id, Attachment.grievance_id).filter_by(sha256=upload_sha256(file)).first()
+    if exact:
+        return {'attachment_id': exact.id, 'grievance_id': exact.grievance_id, 'distance': 0}
+    if fingerprint is None:
+        return None
+    matches = photo_index.find(fingerprint)
+    return matches[0] if matches else None
+
+def reused_photo_message(match):
+    original = db.session.get(Grievance, match['grievance_id'])
+    complaint_id = original.complaint_id if original else match['grievance_id']
+    return f"Photo reuses an earlier upload from complaint {complaint_id} (hash distance {match['distance']}/64)."
+
+image_prefilter = ImagePrefilter(
+    enabled=app.config['IMAGE_PREFILTER_ENABLED'],
+    min_edge=app.config['IMAGE_PREFILTER_MIN_EDGE'],
+    min_stddev=app.config['IMAGE_PREFILTER_MIN_STDDEV'],
+    min_entropy=app.config['IMAGE_PREFILTER_MIN_ENTROPY'],
+    min_sharpness=app.config['IMAGE_PREFILTER_MIN_SHARPNESS']
+)
+
+def precheck_resolution_photo(file):
+    """
+    Local checks that run before the CV audit: the image pre-filter, then reused-photo detection.
+    Returns (fingerprint, failure_message); a failure message fails the audit without a model call.
+    """
+    verdict, reason, message = image_prefilter.check(file, file.content_type, require_image=True)
+    if verdict == REJECT:
+        image_prefilter.record(verdict, reason)
+        return None, message
+    fingerprint = image_fingerprint(file)
+    reused_photo = find_reused_photo(file, fingerprint)
+    if reused_photo:
+        image_prefilter.record(REJECT, 'reused_photo')
+        return fingerprint, reused_photo_message(reused_photo)
+    image_prefilter.record(MODEL)
+    return fingerprint, None
+
+def precheck_complaint_photo(file, user_id):
+    """
+    Local checks on a complaint's main photo before any vision call: the image pre-filter, then
+    reused-photo detection. A photo already uploaded with someone else's complaint is rejected;
+    re-filing one's own photo is allowed. Returns a dict with verdict, fingerprint and message.
+    """
+    verdict, reason, message = image_prefilter.check(file, file.content_type)
+    check = {'file': file, 'verdict': verdict, 'fingerprint': None, 'message': message}
+    if verdict != MODEL:
+        image_prefilter.record(verdict, reason)
+        return check
+    check['fingerprint'] = image_fingerprint(file)
+    reused_photo = find_reused_photo(file, check['fingerprint'])
+    if reused_photo:
+        original = db.session.get(Grievance, reused_photo['grievance_id'])
+        if original is None or original.user_id != user_id:
+            image_prefilter.record(REJECT, 'reused_photo')
+            check.update(verdict=REJECT, message=reused_photo_message(reused_photo))
+            return check
+    image_prefilter.record(MODEL)
+    return check
+
+audit_cache = AuditResponseCache(
+    max_entries=app.config['AUDIT_CACHE_MAX_ENTRIES'],
+    ttl=app.config['AUDIT_CACHE_TTL_SECONDS']
+)
+
+ledger_block_builder = BlockBuilder(
+    app,
+    seal_ledger_block,
+    block_size=app.config['LEDGER_BLOCK_SIZE'],
+    max_latency=app.config['LEDGER_BLOCK_MAX_LATENCY_SECONDS']
+)
+
 def call_gemini_ai(raw_text, location_tag):
+    cache_key = triage_cache_key(raw_text, location_tag, TRIAGE_PROMPT_VERSION)
+    cached_results = triage_cache.get(cache_key)
+    if cached_results is not None:
+        return cached_results
+    ai_results = request_gemini_triage(raw_text, location_tag)
+    # Only a fully parsed model response carries raw_text_processed; fallbacks are never cached.
+    if 'raw_text_processed' in ai_results:
+        triage_cache.set(cache_key, ai_results)
+    return ai_results
+
+def request_gemini_triage(raw_text, location_tag):
     api_key = os.getenv('GEMINI_API_KEY')
     if not api_key:
         return {
@@ -215,48 +1360,21 @@ def call_gemini_ai(raw_text, location_tag):
             'department_id': "ADM_003"
         }
 
-    # 2. Define the System Instruction for the Model's Persona
-    system_instruction = (
-        "You are a highly efficient, multilingual Grievance Triage Agent for the AP Government's "
-        "RTGS system. Your task is to analyze raw citizen complaints (which may include Telugu "
-        "written in English script or code-switching), provide a specific classification, "
-        "translate/transliterate the raw text for clarity, and output a professional, "
-        "actionable summary for the concerned department head in a precise JSON format. "
-        "The classification must be one of: 'Road Maintenance (Pothole)', 'Water Supply & Leakage', "
-        "'Stray Dog Menace', 'Electrical (Streetlight Outage)', or 'General Municipal Service'. "
-        "Assign the Department ID based on the classification: ENG_001 (Engineering/Roads/Electric), "
-        "WTR_002 (Water), HIN_002 (Health/Nuisance), or ADM_003 (General/Admin)."
-    )
-
     user_prompt = (
         f"Analyze the following citizen complaint submitted for the location: '{location_tag}'. "
         f"Original Complaint: '{raw_text}'. "
         "Please provide the output strictly in the requested JSON structure."
     )
-    response_schema = {
-        "type": "OBJECT",
-        "properties": {
-            "classification": {"type": "STRING", "description": "The specific category of the grievance."},
-            "department_id": {"type": "STRING", "description": "The target department ID based on the classification."},
-            "raw_text_processed": {"type": "STRING", "description": "The original citizen text translated/cleaned for clarity (e.g., Telugu transliteration into English or clean Telugu script)."},
-            "professional_text": {"type": "STRING", "description": "A formal, concise summary of the issue ready for the officer's report."}
-        },
-        "required": ["classification", "department_id", "raw_text_processed", "professional_text"]
-    }
     payload = {
         "contents": [{"parts": [{"text": user_prompt}]}],
-        "systemInstruction": {"parts": [{"text": system_instruction}]},
+        "systemInstruction": {"parts": [{"text": TRIAGE_SYSTEM_INSTRUCTION}]},
         "generationConfig": {
             "responseMimeType": "application/json",
-            "responseSchema": response_schema
+            "responseSchema": TRIAGE_RESPONSE_SCHEMA
         },
     }
-    api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-05-20:generateContent?key={api_key}"
-    
     try:
-        response = requests.post(api_url, headers={'Content-Type': 'application/json'}, data=json.dumps(payload))
-        response.raise_for_status()
-        result = response.json()
+        result = gemini_client.generate_content(payload, api_key, 'call_gemini_ai')
         json_text = result.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', '{}')
         try:
             parsed_json = json.loads(json_text)
@@ -266,7 +1384,7 @@ def call_gemini_ai(raw_text, location_tag):
             return parsed_json
             
         except json.JSONDecodeError:
-            print("Gemini Response Parsing Error: Output was not valid JSON.")
+            logger.warning("Gemini triage response was not valid JSON")
             return {
                 'classification': "General Municipal Service",
                 'professional_text': f"AI Parsing Failed. Raw text submitted: {raw_text[:100]}...",
@@ -274,15 +1392,21 @@ def call_gemini_ai(raw_text, location_tag):
             }
 
 
+    except CircuitOpenError:
+        return {
+            'classification': "General Municipal Service",
+            'professional_text': f"AI triage temporarily unavailable. Raw text submitted: {raw_text[:100]}...",
+            'department_id': "ADM_003"
+        }
     except requests.exceptions.RequestException as e:
-        print(f"Gemini API Request Failed: {e}")
+        logger.error("Gemini triage request failed", extra={'error': str(e)})
         return {
             'classification': "Error: API Request Failed",
             'professional_text': f"Could not reach API service. Error: {e}",
             'department_id': "ADM_003"
         }
     except Exception as e:
-        print(f"Unexpected Error in call_gemini_ai: {e}")
+        logger.exception("Unexpected error in call_gemini_ai")
         return {
             'classification': "Error: Unexpected Failure",
             'professional_text': "An unhandled server exception occurred during AI processing.",
@@ -292,6 +1416,7 @@ def call_gemini_ai(raw_text, location_tag):
 # app.py (New Vision Validation Function)
 
 def gemini_vision_validation(grievance_type, image_base64):
+    """Returns (score, message); score is None when the model is unavailable and no verdict was reached."""
     api_key = os.getenv('GEMINI_API_KEY')
     if not api_key:
         return 0.0, "API Key Missing for Vision Validation."
@@ -310,7 +1435,7 @@ def gemini_vision_validation(grievance_type, image_base64):
     contents = [
         {"parts": [
             {"text": audit_prompt},
-            {"inlineData": {"mimeType": "image/jpeg", "data": image_base64}}
+            {"inlineData": {"mimeType": MODEL_IMAGE_MIME_TYPE, "data": image_base64}}
         ]}
     ]
     response_schema = {
@@ -331,23 +1456,98 @@ def gemini_vision_validation(grievance_type, image_base64):
         },
     }
 
-    api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-05-20:generateContent?key={api_key}"
-    
     try:
-        response = requests.post(api_url, headers={'Content-Type': 'application/json'}, data=json.dumps(payload))
-        response.raise_for_status() 
-        
-        result = response.json()
+        result = gemini_client.generate_content(payload, api_key, 'gemini_vision_validation')
         json_text = result.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', '{}')
         parsed_json = json.loads(json_text)
         
         return parsed_json.get('score', 0.0), parsed_json.get('message', 'Validation successful but response was generic.')
 
+    except CircuitOpenError:
+        return None, "Vision validation temporarily unavailable."
     except Exception as e:
-        print(f"FATAL GEMINI VISION VALIDATION ERROR: {e}")
+        logger.exception("Gemini vision validation failed")
         return 0.0, f"Vision validation failed due to server error: {e}"
 
+COMBINED_TRIAGE_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        **TRIAGE_RESPONSE_SCHEMA["properties"],
+        "visual_relevance_score": {"type": "NUMBER", "description": "Relevance of the attached photo to the classification (0.0 to 1.0)."},
+        "visual_message": {"type": "STRING", "description": "Concise image validation message."}
+    },
+    "required": TRIAGE_RESPONSE_SCHEMA["required"] + ["visual_relevance_score", "visual_message"]
+}
+
+def gemini_combined_triage(raw_text, location_tag, image_base64):
+    """Text triage and photo relevance in one request. Returns None if the caller should fall back to two calls."""
+    api_key = os.getenv('GEMINI_API_KEY')
+    if not api_key:
+        return None
+    system_instruction = (
+        TRIAGE_SYSTEM_INSTRUCTION + " "
+        "A photo submitted by the citizen is attached. Also rate how relevant the photo's visual content is "
+        "to the classification you chose (1.0 = clearly shows the reported issue, 0.0 = unrelated, e.g. a cat "
+        "or a birthday cake for a pothole complaint) and give a brief validation message."
+    )
+    user_prompt = (
+        f"Analyze the following citizen complaint submitted for the location: '{location_tag}'. "
+        f"Original Complaint: '{raw_text}'. "
+        "Classify it, then rate the attached photo's visual relevance to that classification. "
+        "Please provide the output strictly in the requested JSON structure."
+    )
+    payload = {
+        "contents": [{"parts": [
+            {"text": user_prompt},
+            {"inlineData": {"mimeType": MODEL_IMAGE_MIME_TYPE, "data": image_base64}}
+        ]}],
+        "systemInstruction": {"parts": [{"text": system_instruction}]},
+        "generationConfig": {
+            "responseMimeType": "application/json",
+            "responseSchema": COMBINED_TRIAGE_RESPONSE_SCHEMA
+        },
+    }
+
+    try:
+        result = gemini_client.generate_content(payload, api_key, 'gemini_combined_triage')
+        json_text = result.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', '{}')
+        parsed_json = json.loads(json_text)
+        missing = [key for key in COMBINED_TRIAGE_RESPONSE_SCHEMA["required"] if key not in parsed_json]
+        if missing:
+            raise ValueError(f"Combined triage response missing {missing}.")
+        parsed_json['visual_relevance_score'] = float(parsed_json['visual_relevance_score'])
+        return parsed_json
+    except Exception as e:
+        logger.warning("Combined triage failed, falling back to two-call path", extra={'error': str(e)})
+        return None
+
+def triage_submission(raw_text, location_tag, image_base64_data=None):
+    """
+    Runs submission triage and returns (ai_results, vision_score, vision_message).
+    The vision values are None when no photo was attached or text triage failed;
+    vision_score alone is None when a photo was sent but the model was unavailable.
+    """
+    if image_base64_data and app.config['SUBMISSION_TRIAGE_STRATEGY'] == 'combined':
+        cache_key = triage_cache_key(raw_text, location_tag, TRIAGE_PROMPT_VERSION)
+        cached_results = triage_cache.get(cache_key)
+        if cached_results is None:
+            combined = gemini_combined_triage(raw_text, location_tag, image_base64_data)
+            if combined is not None:
+                triage_cache.set(cache_key, {key: combined[key] for key in TRIAGE_RESPONSE_SCHEMA["required"]})
+                return combined, combined['visual_relevance_score'], combined['visual_message']
+        else:
+            # Text triage is already known, so the vision check alone is the cheapest remaining call.
+            vision_score, vision_message = gemini_vision_validation(cached_results['classification'], image_base64_data)
+            return cached_results, vision_score, vision_message
+
+    ai_results = call_gemini_ai(raw_text, location_tag)
+    if not image_base64_data or 'Error' in ai_results['classification']:
+        return ai_results, None, None
+    vision_score, vision_message = gemini_vision_validation(ai_results['classification'], image_base64_data)
+    return ai_results, vision_score, vision_message
+
 def gemini_cv_audit(grievance_type, after_image_base64, mock_gps, officer_id, before_image_path=None):
+    """Returns (score, message); score is None when the model is unavailable and no verdict was reached."""
     api_key = os.getenv('GEMINI_API_KEY')
     if not api_key:
         return 0.0, "API Key Missing for CV Audit."
@@ -366,7 +1566,7 @@ def gemini_cv_audit(grievance_type, after_image_base64, mock_gps, officer_id, be
     contents = [
         {"parts": [
             {"text": audit_prompt},
-            {"inlineData": {"mimeType": "image/jpeg", "data": after_image_base64}}
+            {"inlineData": {"mimeType": MODEL_IMAGE_MIME_TYPE, "data": after_image_base64}}
         ]}
     ]
     response_schema = {
@@ -386,22 +1586,128 @@ def gemini_cv_audit(grievance_type, after_image_base64, mock_gps, officer_id, be
             "responseSchema": response_schema
         },
     }
-    api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-05-20:generateContent?key={api_key}"
-    
     try:
-        response = requests.post(api_url, headers={'Content-Type': 'application/json'}, data=json.dumps(payload))
-        response.raise_for_status() 
-        
-        result = response.json()
+        result = gemini_client.generate_content(payload, api_key, 'gemini_cv_audit')
         json_text = result.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', '{}')
         parsed_json = json.loads(json_text)
         
         return parsed_json.get('score', 0.0), parsed_json.get('message', 'CV analysis successful but response was generic.')
 
+    except CircuitOpenError:
+        return None, "CV audit temporarily unavailable."
     except Exception as e:
-        print(f"FATAL GEMINI CV AUDIT ERROR: {e}")
+        logger.exception("Gemini CV audit failed")
         return 0.0, f"Real-time CV Audit failed due to server error: {e}"
 
+triage_executor = ThreadPoolExecutor(max_workers=app.config['TRIAGE_WORKERS'], thread_name_prefix='triage')
+
+def enqueue_triage_job(job_id, delay=0):
+    if delay:
+        timer = threading.Timer(delay, enqueue_triage_job, args=(job_id,))
+        timer.daemon = True
+        timer.start()
+        return
+    triage_executor.submit(run_triage_job, job_id)
+
+def claim_triage_job(job_id):
+    # Conditional UPDATE so only one gunicorn worker can pick up a job re-queued on several of them.
+    claimed = TriageJob.query.filter_by(id=job_id, status='QUEUED').update(
+        {'status': 'RUNNING', 'attempts': TriageJob.attempts + 1, 'updated_at': datetime.now()},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return claimed == 1
+
+def run_triage_job(job_id):
+    with app.app_context():
+        try:
+            if not claim_triage_job(job_id):
+                return
+            job = db.session.get(TriageJob, job_id)
+            grievance = db.session.get(Grievance, job.grievance_id)
+            image_base64_data = None
+            attachment = Attachment.query.filter_by(grievance_id=grievance.id).order_by(Attachment.id).first()
+            # The pre-filter verdict from submission decides whether the photo still needs the vision
+            # model; uploads stored before verdicts were recorded fall back to their media type.
+            if attachment is None:
+                needs_vision = False
+            elif attachment.prefilter_verdict:
+                needs_vision = attachment.prefilter_verdict == MODEL
+            else:
+                needs_vision = not (attachment.file_type or '').startswith(('video/', 'audio/'))
+            if needs_vision and os.path.exists(attachment_file(attachment.file_path)):
+                with open(attachment_file(attachment.file_path), 'rb') as image_file:
+                    image_base64_data = image_to_base64(image_file)
+
+            ai_results, vision_score, vision_message = triage_submission(grievance.raw_text, grievance.location_tag, image_base64_data)
+            if 'Error' in ai_results['classification']:
+                raise RuntimeError(ai_results['professional_text'])
+            if image_base64_data and vision_score is None:
+                # No photo verdict yet: retry with backoff; once out of attempts the complaint goes to manual review.
+                raise RuntimeError(vision_message)
+
+            classification = ai_results['classification']
+            grievance.grievance_type = classification
+            grievance.raw_text_processed = ai_results.get('raw_text_processed')
+            grievance.professional_text = ai_results['professional_text']
+            grievance.assigned_officer_id = ai_results['department_id']
+            grievance.status = 'PENDING'
+            if vision_score is not None and vision_score < 0.5:
+                grievance.professional_text = f"Image validation failed ({vision_message}). Content is unrelated to '{classification}'."
+                grievance.status = 'REJECTED'
+            job.status = 'DONE'
+            job.updated_at = datetime.now()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Triage job failed", extra={'job_id': job_id})
+            fail_triage_job(job_id, e)
+        finally:
+            db.session.remove()
+
+def cv_audit_unavailable_response(cv_message):
+    """503 for a resolution whose CV audit got no verdict; nothing is recorded, so the officer can resubmit."""
+    retry_after = int(gemini_client.breaker.reset_seconds)
+    return jsonify({
+        "message": "CV audit is temporarily unavailable; the resolution was not recorded. Please resubmit shortly.",
+        "reason": cv_message,
+        "status": "CV_AUDIT_UNAVAILABLE"
+    }), 503, {'Retry-After': str(retry_after)}
+
+def fail_triage_job(job_id, error):
+    job = db.session.get(TriageJob, job_id)
+    if not job:
+        return
+    job.last_error = str(error)
+    job.updated_at = datetime.now()
+    if job.attempts < app.config['TRIAGE_MAX_ATTEMPTS']:
+        job.status = 'QUEUED'
+        db.session.commit()
+        enqueue_triage_job(job_id, delay=2 ** job.attempts)
+        return
+    # Out of retries: route to General/Admin so the complaint is not stuck in triage forever.
+    job.status = 'FAILED'
+    grievance = db.session.get(Grievance, job.grievance_id)
+    if grievance and grievance.status == 'TRIAGE_PENDING':
+        grievance.grievance_type = "General Municipal Service"
+        grievance.professional_text = f"AI triage unavailable. Raw text submitted: {grievance.raw_text[:100]}..."
+        grievance.assigned_officer_id = "ADM_003"
+        grievance.status = 'PENDING'
+    db.session.commit()
+
+def recover_triage_jobs():
+    """Re-queues triage jobs left behind by a restart (QUEUED, or RUNNING past their lease)."""
+    lease_expired = datetime.now() - timedelta(seconds=app.config['TRIAGE_JOB_LEASE_SECONDS'])
+    TriageJob.query.filter(TriageJob.status == 'RUNNING', TriageJob.updated_at < lease_expired).update(
+        {'status': 'QUEUED'}, synchronize_session=False
+    )
+    db.session.commit()
+    pending_jobs = TriageJob.query.filter_by(status='QUEUED').all()
+    for job in pending_jobs:
+        enqueue_triage_job(job.id)
+    if pending_jobs:
+        logger.info("Re-queued pending triage jobs", extra={'jobs': len(pending_jobs)})
+
 @app.route('/')
 def home():
     return redirect(url_for('serve_login'))
@@ -535,7 +1841,7 @@ def officer_login():
                 raise Exception("Officer Model class not found in globals.")
 
     except Exception as e:
-        print(f"FATAL DATABASE ERROR DURING OFFICER LOGIN: {e}")
+        logger.exception("Database error during officer login")
         return jsonify({"message": "Server configuration error: Database Query Failed."}), 500
 
     if officer and officer.password == password: 
@@ -547,7 +1853,7 @@ def officer_login():
              globals().get('Grievance') 
              globals().get('ResolutionProof') 
         except:
-             print("WARNING: Failed to load secondary model classes globally.")
+             logger.warning("Failed to load secondary model classes globally")
 
         return jsonify({
             "message": f"Welcome Officer {officer.name}",
@@ -569,11 +1875,11 @@ def get_user_kpis():
     user = User.query.filter_by(user_id=current_user_id).first()
     if not user:
         return jsonify({"message": "User not found."}), 404
-    total_count = Grievance.query.filter_by(user_id=current_user_id).count()
-    resolved_count = Grievance.query.filter_by(user_id=current_user_id, status='RESOLVED').count()
-    pending_count = Grievance.query.filter_by(user_id=current_user_id, status='PENDING').count()
-    fake_count = Grievance.query.filter_by(user_id=current_user_id, status='FRAUD').count() 
-    total_complaints = total_count
+    kpis = grievance_kpis(Grievance.user_id == current_user_id)
+    resolved_count = kpis['resolved']
+    pending_count = kpis['pending']
+    fake_count = kpis['fraud']
+    total_complaints = kpis['total']
     reward_points = (resolved_count * 10) - (fake_count * 5)
     if reward_points < 0: reward_points = 0
     resolution_rate = f"{round((resolved_count / total_complaints) * 100)}%" if total_complaints > 0 else "0%"
@@ -586,7 +1892,7 @@ def get_user_kpis():
         "fake_complaints": fake_count, 
         "reward_points": reward_points, 
         "resolution_rate": resolution_rate,
-        "avg_resolution_days": 3,
+        "avg_resolution_days": kpis['avg_resolution_days'],
         "customer_score": "92%", 
         "rag_status": "GREEN"
     }), 200
@@ -605,34 +1911,52 @@ def submit_grievance():
 
     if not raw_text or not location_tag:
         return jsonify({"message": "Complaint details and location are required."}), 400
-    ai_results = call_gemini_ai(raw_text, location_tag)
-    
-    if 'Error' in ai_results['classification']:
-        return jsonify(ai_results), 500
-    
-    classification = ai_results['classification']
-    if files and files[0].filename:
-        main_proof_file = files[0]
+    main_proof_file = files[0] if files and files[0].filename else None
+    photo_check = None
+    if main_proof_file:
+        photo_check = precheck_complaint_photo(main_proof_file, current_user_id)
+        if photo_check['verdict'] == REJECT:
+            return jsonify({
+                "message": "Photo rejected before AI review.",
+                "reason": photo_check['message'],
+                "classification": "PHOTO_REJECTED"
+            }), 400
+        if photo_check['verdict'] != MODEL:
+            main_proof_file = None
+    if app.config['TRIAGE_MODE'] == 'async':
+        return submit_grievance_async(user, raw_text, location_tag, files, photo_check)
+    image_base64_data = None
+    if main_proof_file:
         try:
             image_base64_data = image_to_base64(main_proof_file)
             main_proof_file.seek(0)
         except Exception:
             return jsonify({"message": "File processing error during Base64 conversion."}), 500
-        vision_score, vision_message = gemini_vision_validation(classification, image_base64_data)
-        if vision_score < 0.5:
-            return jsonify({
-                "message": "Fraud Detection: Visual evidence mismatch. Score below 50%.",
-                "reason": f"Image validation failed ({vision_message}). Content is unrelated to '{classification}'.",
-                "classification": "FRAUD_REJECTED"
-            }), 400
-    complaint_count = Grievance.query.count() + 1 
-    complaint_id = f"COMPLAINT{user.aadhar_number[-4:]}{datetime.now().strftime('%Y%m%d%H%M%S')}{complaint_count}"
+    ai_results, vision_score, vision_message = triage_submission(raw_text, location_tag, image_base64_data)
+    
+    if 'Error' in ai_results['classification']:
+        return jsonify(ai_results), 500
+    if image_base64_data and vision_score is None:
+        # The vision model is unavailable: queue the complaint for background triage instead of rejecting it.
+        return submit_grievance_async(user, raw_text, location_tag, files, photo_check)
+    
+    classification = ai_results['classification']
+    if vision_score is not None and vision_score < 0.5:
+        return jsonify({
+            "message": "Fraud Detection: Visual evidence mismatch. Score below 50%.",
+            "reason": f"Image validation failed ({vision_message}). Content is unrelated to '{classification}'.",
+            "classification": "FRAUD_REJECTED"
+        }), 400
+    complaint_id = generate_complaint_id(user.aadhar_number)
+    seriousness, priority_score = classify_seriousness(raw_text)
     try:
         new_grievance = Grievance(
             user_id=current_user_id, 
             complaint_id=complaint_id,
             raw_text=raw_text,
-            raw_text_processed=ai_results['raw_text_processed'],
+            seriousness=seriousness,
+            priority_score=priority_score,
+            raw_text_processed=ai_results.get('raw_text_processed'),
             professional_text=ai_results['professional_text'],
             grievance_type=classification,
             location_tag=location_tag,
@@ -642,23 +1966,7 @@ def submit_grievance():
         db.session.add(new_grievance)
         db.session.flush() 
         grievance_db_id = new_grievance.id 
-        if files and files[0].filename:
-            upload_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'grievance', complaint_id)
-            os.makedirs(upload_dir, exist_ok=True)
-            
-            for file in files:
-                if file.filename:
-                    file.seek(0) 
-                    filename = secure_filename(file.filename)
-                    file_path = os.path.join(upload_dir, filename)
-                    file.save(file_path)
-                    
-                    new_attachment = Attachment(
-                        grievance_id=new_grievance.id, 
-                        file_path=file_path,
-                        file_type=file.content_type
-                    )
-                    db.session.add(new_attachment)
+        store_submission_attachments(new_grievance, files, photo_check)
         db.session.commit()
         return jsonify({
             "message": "Grievance submitted and AI classified successfully!",
@@ -669,9 +1977,41 @@ def submit_grievance():
 
     except Exception as e:
         db.session.rollback()
-        print(f"DATABASE SUBMISSION FAILED: {str(e)}")
+        logger.exception("Grievance submission failed")
+        return jsonify({"message": "Submission Failed: Database Error. Please check Flask console."}), 500
+
+def submit_grievance_async(user, raw_text, location_tag, files, photo_check=None):
+    complaint_id = generate_complaint_id(user.aadhar_number)
+    seriousness, priority_score = classify_seriousness(raw_text)
+    try:
+        new_grievance = Grievance(
+            user_id=user.user_id,
+            complaint_id=complaint_id,
+            raw_text=raw_text,
+            seriousness=seriousness,
+            priority_score=priority_score,
+            location_tag=location_tag,
+            status='TRIAGE_PENDING'
+        )
+        db.session.add(new_grievance)
+        db.session.flush()
+        store_submission_attachments(new_grievance, files, photo_check)
+        job = TriageJob(grievance_id=new_grievance.id, status='QUEUED')
+        db.session.add(job)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Grievance submission failed")
         return jsonify({"message": "Submission Failed: Database Error. Please check Flask console."}), 500
 
+    enqueue_triage_job(job.id)
+    return jsonify({
+        "message": "Grievance received. AI classification is in progress.",
+        "grievance_id": complaint_id,
+        "status": new_grievance.status,
+        "classification": None
+    }), 202
+
 @app.route('/api/grievances/me', methods=['GET'])
 def get_user_grievances():
     if 'logged_in' not in session or not session['logged_in']:
@@ -687,27 +2027,24 @@ def get_user_grievances():
     
     if status_filter and status_filter != 'All':
         query = query.filter_by(status=status_filter.upper())
-    grievances = query.order_by(Grievance.created_at.desc()).all()
-    grievance_list = []
-    for g in grievances:
-        attachments_info = [
-            {'id': a.id, 'file_path': a.file_path, 'file_type': a.file_type}
-            for a in g.attachments
-        ]
-        
-        grievance_list.append({
-            'id': g.id,
-            'complaint_id': g.complaint_id,
-            'type': g.grievance_type,
-            'raw_text': g.raw_text,
-            'professional_text': g.professional_text,
-            'location': g.location_tag,
-            'status': g.status,
-            'created_at': g.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-            'attachments': attachments_info
-        })
-            
-    return jsonify(grievance_list), 200
+    fields = requested_fields()
+    query = apply_field_projection(query, fields)
+    if fields is None or 'attachments' in fields:
+        # Attachments for the whole page arrive in one IN query instead of one lazy load per row.
+        query = query.options(selectinload(Grievance.attachments))
+
+    if not pagination_requested():
+        grievances = query.order_by(Grievance.created_at.desc()).all()
+        return jsonify([serialize_grievance(g, CITIZEN_GRIEVANCE_FIELDS, fields) for g in grievances]), 200
+
+    try:
+        grievances, next_cursor = paginate_grievances(query)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    return jsonify({
+        "grievances": [serialize_grievance(g, CITIZEN_GRIEVANCE_FIELDS, fields) for g in grievances],
+        "next_cursor": next_cursor
+    }), 200
 
 @app.route('/api/preview_ai', methods=['POST'])
 def preview_ai_classification():
@@ -732,26 +2069,13 @@ def save_draft():
     
     current_user_id = session['user_id']
     data = request.get_json()
-    draft = Draft.query.filter_by(user_id=current_user_id).first()
     
     try:
-        if draft:
-            draft.raw_text = data.get('raw_text', '')
-            draft.location = data.get('location', '')
-        else:
-            draft = Draft(
-                user_id=current_user_id,
-                raw_text=data.get('raw_text', ''),
-                location=data.get('location', '')
-            )
-            db.session.add(draft)
-            
-        db.session.commit()
-        return jsonify({"message": "Draft saved automatically", "saved_at": draft.saved_at.strftime("%H:%M:%S")}), 200
+        saved_at = draft_store.save(current_user_id, data.get('raw_text', ''), data.get('location', ''))
+        return jsonify({"message": "Draft saved automatically", "saved_at": saved_at.strftime("%H:%M:%S")}), 200
 
     except Exception as e:
-        db.session.rollback()
-        print(f"DRAFT SAVE FAILED: {str(e)}")
+        logger.exception("Draft save failed")
         return jsonify({"message": "Draft save failed internally."}), 500
 
 
@@ -761,9 +2085,17 @@ def load_draft():
         return jsonify({"message": "Unauthorized"}), 401
     
     current_user_id = session['user_id']
+    buffered = draft_store.load(current_user_id)
+    if buffered:
+        return jsonify({
+            "raw_text": buffered['raw_text'],
+            "location": buffered['location'],
+            "saved_at": buffered['saved_at'].strftime("%H:%M:%S")
+        }), 200
+
     draft = Draft.query.filter_by(user_id=current_user_id).first()
     
-    if draft:
+    if draft and not is_tombstone(draft.raw_text, draft.location):
         return jsonify({
             "raw_text": draft.raw_text,
             "location": draft.location,
@@ -779,19 +2111,15 @@ def delete_draft():
         return jsonify({"message": "Unauthorized"}), 401
     
     current_user_id = session['user_id']
-    draft = Draft.query.filter_by(user_id=current_user_id).first()
     
     try:
-        if draft:
-            db.session.delete(draft)
-            db.session.commit()
+        if draft_store.delete(current_user_id):
             return jsonify({"message": "Draft deleted."}), 200
         else:
             return jsonify({"message": "No draft to delete."}), 404
             
     except Exception as e:
-        db.session.rollback()
-        print(f"DRAFT DELETE FAILED: {str(e)}")
+        logger.exception("Draft delete failed")
         return jsonify({"message": "Draft delete failed."}), 500
 @app.route('/api/resolution/submit/<int:grievance_id>', methods=['POST'])
 def submit_resolution(grievance_id):
@@ -809,19 +2137,20 @@ def submit_resolution(grievance_id):
         
         if not file:
             return jsonify({"message": "Resolution proof file is required."}), 400
-        file_bytes = file.read()
-        file_hash = hashlib.sha256(file_bytes + mock_gps.encode('utf-8') + officer_id.encode('utf-8')).hexdigest()
-        
-        after_image_base64 = image_to_base64(file)
-        cv_score, cv_analysis_message = gemini_cv_audit(
-            grievance.grievance_type, 
-            after_image_base64, 
-            mock_gps, 
-            officer_id
-        )
-        file.seek(0) 
-        file_bytes = file.read()
-        file_hash = hashlib.sha256(file_bytes + mock_gps.encode('utf-8') + officer_id.encode('utf-8')).hexdigest()
+        # An unusable photo, or one already on file, fails the audit locally.
+        fingerprint, precheck_failure = precheck_resolution_photo(file)
+        if precheck_failure:
+            cv_score, cv_analysis_message = 0.0, precheck_failure
+        else:
+            after_image_base64 = image_to_base64(file)
+            cv_score, cv_analysis_message = gemini_cv_audit(
+                grievance.grievance_type, 
+                after_image_base64, 
+                mock_gps, 
+                officer_id
+            )
+            if cv_score is None:
+                return cv_audit_unavailable_response(cv_analysis_message)
         is_fraudulent = False
         fraud_reason = None
         if '1.0, 1.0' in mock_gps:
@@ -832,39 +2161,53 @@ def submit_resolution(grievance_id):
              is_fraudulent = True
              fraud_reason = f"Low CV Confidence Score ({cv_score*100:.0f}%) detected: {cv_analysis_message}"
 
+        # Stored (and so indexed) either way, so a later reuse of this photo is caught too.
+        file.seek(0)
+        photo_sha256 = store_attachment(grievance, file, file_type='resolution_photo', fingerprint=fingerprint).sha256
+        resolved_at = datetime.now()
         if is_fraudulent:
             grievance.status = 'FRAUD'
+            grievance.resolved_at = resolved_at
             grievance.fake_flag_reason = fraud_reason
             db.session.commit()
             return jsonify({
                 "message": f"Resolution flagged as potential fraud: {fraud_reason}", 
                 "reason": fraud_reason
             }), 409 
+        file_hash, ledger_receipt = record_ledger_resolution(grievance, officer_id, cv_score, is_fraudulent, photo_sha256, resolved_at)
         new_proof = ResolutionProof(
             grievance_id=grievance.id,
             officer_id=officer_id,
             cv_score=cv_score,
             is_fraudulent=is_fraudulent,
-            proof_hash=file_hash
+            proof_hash=file_hash,
+            verified_at=resolved_at
         )
         db.session.add(new_proof)
         grievance.status = 'RESOLVED'
+        grievance.resolved_at = resolved_at
         officer = Officer.query.filter_by(officer_id=officer_id).first()
         if officer:
              officer.resolved_count = (officer.resolved_count or 0) + 1
              officer.performance_score = min(100, 95 + (officer.resolved_count * 1))
 
         db.session.commit()
+        audit_cache.invalidate(grievance.complaint_id)
 
-        return jsonify({
+        response = {
             "message": "Resolution successfully committed to DLT Ledger.",
             "proof_hash": file_hash,
             "status": "RESOLVED"
-        }), 200
+        }
+        if ledger_receipt:
+            ledger_block_builder.notify()
+            response["message"] = "Resolution recorded; its ledger entry will be sealed in the next block."
+            response["ledger_receipt"] = receipt_payload(ledger_receipt)
+        return jsonify(response), 200
 
     except Exception as e:
         db.session.rollback()
-        print(f"RESOLUTION SUBMISSION FAILED: {str(e)}")
+        logger.exception("Resolution submission failed")
         return jsonify({"message": "An internal server error occurred during resolution."}), 500
     
     
@@ -888,45 +2231,35 @@ def officer_dashboard():
     try:
         Officer_Model = globals().get('Officer')
         Grievance_Model = globals().get('Grievance')
-        Attachment_Model = globals().get('Attachment')
             
         officer = Officer_Model.query.filter_by(officer_id=officer_id).first()
         if not officer:
             return jsonify({"message": "Officer account not found."}), 404
-        base_query = Grievance_Model.query.filter_by(assigned_officer_id=officer_id)
-        total_assigned_count = base_query.count()
-        pending_count = base_query.filter(Grievance_Model.status.in_(['PENDING', 'REOPENED'])).count()
-        resolved_count = base_query.filter_by(status='RESOLVED').count()
-        fraud_count = base_query.filter_by(status='FRAUD').count()
+        kpis = grievance_kpis(Grievance_Model.assigned_officer_id == officer_id)
+        total_assigned_count = kpis['total']
+        pending_count = kpis['pending'] + kpis['reopened']
+        resolved_count = kpis['resolved']
+        fraud_count = kpis['fraud']
         filtered_query = Grievance_Model.query.filter_by(assigned_officer_id=officer_id)
-        if filter_seriousness == 'IMMEDIATE':
-            filtered_query = filtered_query.filter(Grievance_Model.raw_text.ilike('%pothole%') | Grievance_Model.raw_text.ilike('%leakage%'))
-        elif filter_seriousness == 'STANDARD':
-            filtered_query = filtered_query.filter(~(Grievance_Model.raw_text.ilike('%pothole%') | Grievance_Model.raw_text.ilike('%leakage%')))
-        if sort_by == 'oldest':
-            filtered_query = filtered_query.order_by(Grievance_Model.created_at.asc())
+        if filter_seriousness in ('IMMEDIATE', 'STANDARD'):
+            filtered_query = filtered_query.filter(Grievance_Model.seriousness == filter_seriousness)
+        fields = requested_fields()
+        filtered_query = apply_field_projection(filtered_query, fields)
+        if fields is None or 'attachment_path' in fields:
+            filtered_query = filtered_query.options(selectinload(Grievance_Model.attachments))
+        next_cursor = None
+        if pagination_requested():
+            try:
+                grievances_to_display, next_cursor = paginate_grievances(filtered_query, descending=sort_by != 'oldest')
+            except ValueError as e:
+                return jsonify({"message": str(e)}), 400
         else:
-            filtered_query = filtered_query.order_by(Grievance_Model.created_at.desc())
-        grievances_to_display = filtered_query.all()
-        grievance_list = []
-        for g in grievances_to_display:
-            attachments = Attachment_Model.query.filter_by(grievance_id=g.id).all()
-            attachments_info = [
-                {'id': a.id, 'file_path': a.file_path, 'file_type': a.file_type}
-                for a in attachments
-            ]
-            
-            grievance_list.append({
-                'id': g.id,
-                'complaint_id': g.complaint_id,
-                'grievance_type': g.grievance_type, 
-                'location_tag': g.location_tag,
-                'raw_text': g.raw_text,
-                'professional_text': g.professional_text,
-                'status': g.status,
-                'created_at': g.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                'attachment_path': attachments[0].file_path if attachments else None
-            })
+            if sort_by == 'oldest':
+                filtered_query = filtered_query.order_by(Grievance_Model.created_at.asc())
+            else:
+                filtered_query = filtered_query.order_by(Grievance_Model.created_at.desc())
+            grievances_to_display = filtered_query.all()
+        grievance_list = [serialize_grievance(g, OFFICER_GRIEVANCE_FIELDS, fields) for g in grievances_to_display]
 
         return jsonify({
             "officer_name": officer.name,
@@ -937,53 +2270,183 @@ def officer_dashboard():
                 "pending": pending_count, 
                 "resolved": resolved_count, 
                 "fraud_count": fraud_count, 
+                "avg_resolution_days": kpis['avg_resolution_days'],
                 "performance_score": officer.performance_score
             },
-            "grievances": grievance_list
+            "grievances": grievance_list,
+            "next_cursor": next_cursor
         }), 200
 
     except Exception as e:
-        print(f"ERROR FETCHING OFFICER DASHBOARD: {e}")
+        logger.exception("Officer dashboard query failed")
         return jsonify({"message": f"Internal server error while fetching dashboard data: {e}"}), 500
 
+# Content hashes of served uploads, keyed by (path, mtime, size) so a rewritten file gets a new ETag.
+upload_etags = MemoryCacheBackend(max_entries=4096)
+
+def upload_etag(file_path, stat):
+    # Blobs are named by their content hash; only legacy files need hashing.
+    etag = blob_sha256(file_path)
+    if etag:
+        return etag
+    key = (file_path, stat.st_mtime_ns, stat.st_size)
+    etag = upload_etags.get(key)
+    if etag is None:
+        with open(file_path, 'rb') as f:
+            etag = stream_sha256(f)
+        upload_etags.set(key, etag, 86400)
+    return etag
+
+def set_upload_cache_headers(response, relative_path):
+    response.cache_control.public = True
+    if relative_path.startswith(app.config['UPLOADS_IMMUTABLE_PREFIXES']):
+        response.cache_control.no_cache = None
+        response.cache_control.max_age = app.config['UPLOADS_IMMUTABLE_MAX_AGE']
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+def upload_response(file_path, etag, last_modified):
+    """Conditional response for a file under uploads/, streamed by Flask or handed to the front-end server."""
+    if app.config['UPLOADS_OFFLOAD'] == 'x-accel-redirect':
+        relative_path = os.path.relpath(file_path, app.config['UPLOADS_ROOT']).replace(os.sep, '/')
+        response = app.response_class(mimetype=mimetypes.guess_type(file_path)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = app.config['UPLOADS_ACCEL_PREFIX'] + quote(relative_path)
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response = response.make_conditional(request)
+    else:
+        # With USE_X_SENDFILE on, send_file emits an X-Sendfile header instead of the body.
+        response = send_file(file_path, etag=etag, last_modified=last_modified, conditional=True)
+    # Uploaded bytes are user-controlled: never let the browser sniff them into HTML.
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+def thumbnail_format():
+    configured = app.config['THUMBNAIL_FORMAT'].upper()
+    if configured != 'AUTO':
+        return 'JPEG' if configured == 'JPG' else configured
+    # Matched literally: a bare image/* does not mean the browser can decode WebP.
+    return 'WEBP' if 'image/webp' in request.headers.get('Accept', '') else 'JPEG'
+
+def app_path(path):
+    """Absolute, normalised form of a stored path; older rows hold paths relative to the app directory."""
+    return os.path.normpath(os.path.join(app.root_path, path))
+
+def attachment_file(file_path):
+    """Where an Attachment.file_path (a blob key, or a pre-blob-store path) lives on disk."""
+    return app_path(blob_store.resolve(file_path))
+
+def attachment_public_path(file_path):
+    """The uploads/... path clients build /uploads URLs from; never an absolute server path."""
+    relative_path = os.path.relpath(attachment_file(file_path), app.config['UPLOADS_ROOT'])
+    if relative_path.startswith('..'):
+        return file_path
+    return 'uploads/' + relative_path.replace(os.sep, '/')
+
+def is_servable_upload(file_path):
+    """Committed blobs and pre-blob-store upload files; never spool temp files or derivatives."""
+    path = app_path(file_path)
+    blob_root = app_path(blob_store.root)
+    if path.startswith(blob_root + os.sep):
+        sha256 = blob_sha256(path)
+        return sha256 is not None and path == app_path(blob_store.path_for(sha256, os.path.splitext(path)[1]))
+    legacy_dirs = tuple(app_path(d) + os.sep for d in (app.config['UPLOAD_FOLDER'], app.config['COMPLAINT_UPLOAD_FOLDER']))
+    return path.startswith(legacy_dirs) and not path.endswith('.tmp')
+
 @app.route('/uploads/<path:filename>')
 def serve_uploads(filename):
-    if filename.startswith('complaints/'):
-        base_dir = os.path.abspath(os.path.join(app.config['COMPLAINT_UPLOAD_FOLDER'], '..'))
-        filename_to_serve = os.path.join('complaints', filename.split('complaints/', 1)[1])
-        
-    elif filename.startswith('profile/'):
-        base_dir = os.path.abspath(os.path.join(app.config['UPLOAD_FOLDER'], '..', 'profile')) 
-        filename_to_serve = os.path.join('profile', filename.split('profile/', 1)[1])
-        
-    else:
-        base_dir = os.path.abspath(app.root_path)
-        filename_to_serve = filename
-        
+    uploads_root = app.config['UPLOADS_ROOT']
+    # safe_join rejects absolute paths and any '..' that would climb out of uploads/.
+    file_path = safe_join(uploads_root, filename)
+    if file_path is None or not is_servable_upload(file_path) or not os.path.isfile(file_path):
+        logger.info("Upload not found", extra={'upload_path': filename})
+        return jsonify({"message": "Image file not found on server."}), 404
+    relative_path = os.path.relpath(file_path, uploads_root).replace(os.sep, '/')
+    size_name = request.args.get('size')
+    if size_name and size_name not in app.config['THUMBNAIL_SIZES']:
+        return jsonify({"message": f"Unknown size '{size_name}'. Use one of: {', '.join(app.config['THUMBNAIL_SIZES'])}."}), 400
+
     try:
-        return send_from_directory(
-            os.path.join(app.root_path, 'uploads'), 
-            as_attachment=False
-        )
+        stat = os.stat(file_path)
+        etag = upload_etag(file_path, stat)
+        if not size_name:
+            return set_upload_cache_headers(upload_response(file_path, etag, stat.st_mtime), relative_path)
+
+        image_format = thumbnail_format()
+        thumbnail_path = derivative_path(app.config['DERIVATIVES_ROOT'], etag, size_name, image_format)
+        try:
+            ensure_derivative(
+                file_path, thumbnail_path, app.config['THUMBNAIL_SIZES'][size_name],
+                image_format, app.config['THUMBNAIL_QUALITY']
+            )
+        except DECODE_ERRORS:
+            return jsonify({"message": "No thumbnail is available for this file."}), 404
+        response = upload_response(thumbnail_path, f"{etag}-{size_name}-{image_format.lower()}", stat.st_mtime)
+        if app.config['THUMBNAIL_FORMAT'] == 'auto':
+            response.vary.add('Accept')
+        return set_upload_cache_headers(response, relative_path)
     except FileNotFoundError:
-        print(f"File not found: {filename}")
+        logger.info("Upload not found", extra={'upload_path': filename})
         return jsonify({"message": "Image file not found on server."}), 404
     except Exception as e:
-        print(f"Error serving file {filename}: {e}")
+        logger.exception("Error serving upload", extra={'upload_path': filename})
         return jsonify({"message": "Server error while accessing file."}), 500
 
+@app.route('/api/ledger/receipt/<string:receipt_token>', methods=['GET'])
+def ledger_receipt_status(receipt_token):
+    receipt = LedgerReceipt.query.filter_by(token=receipt_token).first()
+    if not receipt:
+        return jsonify({"message": "Ledger receipt not found."}), 404
+    return jsonify(receipt_payload(receipt)), 200
+
+AUDIT_SETTLED_STATUSES = ('RESOLVED', 'FRAUD', 'DELETED')
+
+def audit_is_settled(audit_data):
+    """Settled records only change through resolve/delete/restore; an unsealed ledger proof is still moving."""
+    if audit_data['status'] not in AUDIT_SETTLED_STATUSES:
+        return False
+    ledger = audit_data.get('ledger')
+    return ledger is None or ledger.get('inclusion', {}).get('status') == 'CHECKPOINTED'
+
+def audit_response(entry):
+    response = app.response_class(entry['body'], mimetype='application/json')
+    response.set_etag(entry['etag'])
+    if entry['last_modified']:
+        response.last_modified = entry['last_modified']
+    response.cache_control.public = True
+    if app.config['AUDIT_CACHE_MAX_AGE_SECONDS'] > 0:
+        response.cache_control.max_age = app.config['AUDIT_CACHE_MAX_AGE_SECONDS']
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
 @app.route('/api/public/audit/<string:complaint_id>', methods=['GET'])
 def public_dlt_audit(complaint_id):
-    Grievance_Model = globals().get('Grievance')
+    # One indexed single-row read decides whether the cached rendering is still current.
+    state = db.session.query(Grievance.status, Grievance.resolved_at).filter_by(complaint_id=complaint_id).first()
+    if not state:
+        return jsonify({"message": f"Complaint ID {complaint_id} not found."}), 404
+    fingerprint = (state.status, state.resolved_at)
+    entry = audit_cache.get(complaint_id, fingerprint)
+    if entry is None:
+        grievance = Grievance.query.filter_by(complaint_id=complaint_id).first()
+        audit_data, status_code = build_public_audit(grievance)
+        if status_code != 200:
+            return jsonify(audit_data), status_code
+        body = app.json.dumps(audit_data).encode('utf-8')
+        entry = AuditResponseCache.render(fingerprint, body, state.resolved_at)
+        if audit_is_settled(audit_data):
+            audit_cache.put(complaint_id, entry)
+    return audit_response(entry)
+
+def build_public_audit(grievance):
     ResolutionProof_Model = globals().get('ResolutionProof')
     Attachment_Model = globals().get('Attachment')
     Officer_Model = globals().get('Officer') 
     
-    grievance = Grievance_Model.query.filter_by(complaint_id=complaint_id).first()
-    
-    if not grievance:
-        return jsonify({"message": f"Complaint ID {complaint_id} not found."}), 404
-    seriousness_tag = "IMMEDIATE" if "pothole" in grievance.raw_text.lower() or "leakage" in grievance.raw_text.lower() else "STANDARD"
+    seriousness_tag = grievance.seriousness or classify_seriousness(grievance.raw_text)[0]
     proof = ResolutionProof_Model.query.filter_by(grievance_id=grievance.id).first()
     audit_data = {
         "complaint_id": grievance.complaint_id,
@@ -995,7 +2458,7 @@ def public_dlt_audit(complaint_id):
 
     if grievance.status == 'RESOLVED' or grievance.status == 'FRAUD':
         if not proof:
-             return jsonify({"message": "Resolution status logged, but DLT proof record is missing."}), 500
+             return {"message": "Resolution status logged, but DLT proof record is missing."}, 500
              
         officer = Officer_Model.query.filter_by(officer_id=proof.officer_id).first()
         officer_name = officer.name if officer else proof.officer_id 
@@ -1004,7 +2467,7 @@ def public_dlt_audit(complaint_id):
         citizen_proofs = []
         
         for a in attachments:
-            attachment_info = {'file_path': a.file_path, 'file_type': a.file_type}
+            attachment_info = {'file_path': attachment_public_path(a.file_path), 'file_type': a.file_type}
             if a.file_type == 'resolution_photo':
                 resolution_proofs.append(attachment_info)
             else:
@@ -1019,10 +2482,25 @@ def public_dlt_audit(complaint_id):
             "is_fraudulent": proof.is_fraudulent,
         }
         
+        ledger_entry = LedgerEntry.query.filter_by(grievance_id=grievance.id).order_by(LedgerEntry.sequence.desc()).first()
+        if ledger_entry:
+            audit_data['ledger'] = {
+                "sequence": ledger_entry.sequence,
+                "entry_hash": ledger_entry.entry_hash,
+                "prev_hash": ledger_entry.prev_hash,
+                "photo_sha256": ledger_entry.photo_sha256,
+                "recorded_at": ledger_entry.recorded_at.isoformat(),
+                "inclusion": ledger_inclusion_proof(ledger_entry)
+            }
+        else:
+            pending_receipt = LedgerReceipt.query.filter_by(grievance_id=grievance.id, status='PENDING').first()
+            if pending_receipt:
+                audit_data['ledger'] = {"status": "PENDING_BLOCK", "receipt_id": pending_receipt.token}
+
         audit_data['resolution_attachments'] = resolution_proofs 
         audit_data['citizen_attachments'] = citizen_proofs     
 
-    return jsonify(audit_data), 200
+    return audit_data, 200
 
 @app.route('/api/complaint/<int:grievance_id>', methods=['GET'])
 def get_complaint_details(grievance_id):
@@ -1047,10 +2525,10 @@ def get_complaint_details(grievance_id):
             'aadhar_last_4': user.aadhar_number[-4:] if user.aadhar_number else 'N/A'
         }
         attachments_info = [
-            {'file_path': a.file_path, 'file_type': a.file_type}
+            {'file_path': attachment_public_path(a.file_path), 'file_type': a.file_type}
             for a in grievance.attachments
         ]
-        seriousness_tag = "IMMEDIATE" if "pothole" in grievance.raw_text.lower() or "leakage" in grievance.raw_text.lower() else "STANDARD"
+        seriousness_tag = grievance.seriousness or classify_seriousness(grievance.raw_text)[0]
 
         return jsonify({
             'grievance': {
@@ -1090,32 +2568,36 @@ def resolve_grievance():
         return jsonify({"message": "Grievance is already marked resolved."}), 400
     if grievance.assigned_officer_id != officer_id:
         return jsonify({"message": "Unauthorized: Grievance not assigned to this officer."}), 403
-    try:
-        after_file_base64 = image_to_base64(after_file)
-        after_file.seek(0)
-    except Exception as e:
-        print(f"Base64 Conversion Error: {e}")
-        return jsonify({"message": "File processing error during Base64 conversion."}), 500
-
-    cv_score, cv_message = gemini_cv_audit(
-        grievance.grievance_type, 
-        after_file_base64, 
-        mock_gps, 
-        officer_id
-    )
+    # An unusable photo, or one already on file (this complaint's own "before" photo included), fails the audit locally.
+    after_fingerprint, precheck_failure = precheck_resolution_photo(after_file)
+    if precheck_failure:
+        cv_score, cv_message = 0.0, precheck_failure
+    else:
+        try:
+            after_file_base64 = image_to_base64(after_file)
+            after_file.seek(0)
+        except Exception as e:
+            logger.exception("Base64 conversion failed")
+            return jsonify({"message": "File processing error during Base64 conversion."}), 500
+
+        cv_score, cv_message = gemini_cv_audit(
+            grievance.grievance_type, 
+            after_file_base64, 
+            mock_gps, 
+            officer_id
+        )
+        if cv_score is None:
+            return cv_audit_unavailable_response(cv_message)
     
     is_fraudulent = cv_score < 0.7 
     status_update = 'FRAUD' if is_fraudulent else 'RESOLVED'
     
     try:
-        COMPLAINT_UPLOAD_FOLDER = 'uploads/complaints'
-        upload_dir = os.path.join(COMPLAINT_UPLOAD_FOLDER, complaint_id, 'resolution_proofs')
-        os.makedirs(upload_dir, exist_ok=True)
-        after_filename = secure_filename(after_file.filename)
-        after_file_path = os.path.join(upload_dir, after_filename)
-        after_file.save(after_file_path)
+        # The blob's content hash doubles as the ledger's photo hash, so the photo is read once for both.
+        resolution_attachment = store_attachment(grievance, after_file, file_type='resolution_photo', fingerprint=after_fingerprint)
+        photo_sha256 = resolution_attachment.sha256
         current_time = datetime.now()
-        proof_hash = calculate_dlt_hash(grievance.complaint_id, officer_id, cv_score, current_time.isoformat())
+        proof_hash, ledger_receipt = record_ledger_resolution(grievance, officer_id, cv_score, is_fraudulent, photo_sha256, current_time)
         ResolutionProof_Model = globals().get('ResolutionProof')
         new_proof = ResolutionProof_Model(
             grievance_id=grievance.id,
@@ -1126,16 +2608,6 @@ def resolve_grievance():
             verified_at=current_time
         )
         db.session.add(new_proof)
-
-        ResolutionProof_Model = globals().get('ResolutionProof')
-        Attachment_Model = globals().get('Attachment') 
-        
-        new_resolution_attachment = Attachment_Model(
-            grievance_id=grievance.id,
-            file_path=after_file_path,
-            file_type='resolution_photo'
-        )
-        db.session.add(new_resolution_attachment)
         grievance.status = status_update
         grievance.resolved_at = current_time 
         officer = Officer_Model.query.filter_by(officer_id=officer_id).first()
@@ -1147,18 +2619,23 @@ def resolve_grievance():
                 officer.performance_score = max(0, officer.performance_score - 5) 
 
         db.session.commit()
+        audit_cache.invalidate(grievance.complaint_id)
 
-        return jsonify({
+        response = {
             "message": f"Resolution logged and verified. Status: {status_update}",
             "dlt_hash": proof_hash,
             "cv_score": cv_score,
             "cv_message": cv_message,
             "is_fraudulent": is_fraudulent
-        }), 200
+        }
+        if ledger_receipt:
+            ledger_block_builder.notify()
+            response["ledger_receipt"] = receipt_payload(ledger_receipt)
+        return jsonify(response), 200
 
     except Exception as e:
         db.session.rollback()
-        print(f"Error resolving grievance and creating proof: {e}")
+        logger.exception("Resolving grievance failed")
         return jsonify({"message": f"Server error during resolution logging: {str(e)}"}), 500
 
 @app.route('/api/grievance/delete/<int:grievance_id>', methods=['POST'])
@@ -1175,6 +2652,7 @@ def soft_delete_grievance(grievance_id):
     try:
         grievance.status = 'DELETED'
         db.session.commit()
+        audit_cache.invalidate(grievance.complaint_id)
         return jsonify({"message": f"Grievance {grievance_id} soft-deleted successfully."}), 200
     except Exception as e:
         db.session.rollback()
@@ -1186,19 +2664,21 @@ def fetch_deleted_grievances():
         return jsonify({"message": "Unauthorized access."}), 401
         
     try:
-        deleted_grievances = Grievance.query.filter_by(status='DELETED').order_by(Grievance.resolved_at.desc()).all()
+        fields = requested_fields()
+        query = apply_field_projection(Grievance.query.filter_by(status='DELETED'), fields)
+        next_cursor = None
+        # Most recently resolved first in both modes.
+        if pagination_requested():
+            try:
+                deleted_grievances, next_cursor = paginate_grievances(query, sort_key=RESOLVED_SORT_KEY)
+            except ValueError as e:
+                return jsonify({"message": str(e)}), 400
+        else:
+            deleted_grievances = query.order_by(RESOLVED_SORT_KEY[0].desc(), Grievance.id.desc()).all()
         
-        grievance_list = []
-        for g in deleted_grievances:
-            grievance_list.append({
-                "id": g.id,
-                "complaint_id": g.complaint_id,
-                "grievance_type": g.grievance_type,
-                "professional_text": g.professional_text,
-                "resolved_at": g.resolved_at.strftime("%Y-%m-%d %H:%M:%S") if g.resolved_at else "N/A"
-            })
+        grievance_list = [serialize_grievance(g, DELETED_GRIEVANCE_FIELDS, fields) for g in deleted_grievances]
             
-        return jsonify({"deleted_grievances": grievance_list}), 200
+        return jsonify({"deleted_grievances": grievance_list, "next_cursor": next_cursor}), 200
     except Exception as e:
         return jsonify({"message": f"Error fetching deleted list: {str(e)}"}), 500
 
@@ -1220,6 +2700,7 @@ def restore_grievance(grievance_id):
             grievance.status = 'RESOLVED'
             
         db.session.commit()
+        audit_cache.invalidate(grievance.complaint_id)
         return jsonify({"message": f"Grievance {grievance_id} restored to {grievance.status} successfully."}), 200
     except Exception as e:
         db.session.rollback()
@@ -1238,16 +2719,69 @@ def logout_user():
     session.pop('logged_in', None)
     return jsonify({"message": "Logged out successfully."}), 200
 
-@app.route('/health')
-def health_check():
-    # Example route to check if the DB is actually working
-    if engine is not None:
+def collect_component_metrics():
+    """Counters the Gemini client, caches and pre-filter already keep, read at scrape time."""
+    endpoints = gemini_client.metrics()['endpoints']
+    caches = {'triage': triage_cache.stats(), 'audit': audit_cache.stats()}
+    prefilter = image_prefilter.stats()
+    families = [
+        (f'gemini_{field}_total', 'counter', f'Gemini {field.replace("_", " ")} by calling function.',
+         [({'function': function}, counts[field]) for function, counts in endpoints.items()])
+        for field in ('calls', 'errors', 'timeouts', 'retries', 'circuit_rejections')
+    ]
+    families += [
+        ('gemini_circuit_open', 'gauge', '1 while the Gemini circuit breaker is open.',
+         [({}, int(gemini_client.breaker.state == 'open'))]),
+        ('cache_hits_total', 'counter', 'Cache hits by cache.', [({'cache': name}, stats['hits']) for name, stats in caches.items()]),
+        ('cache_misses_total', 'counter', 'Cache misses by cache.', [({'cache': name}, stats['misses']) for name, stats in caches.items()]),
+        ('cache_hit_ratio', 'gauge', 'Hits over lookups since the worker started.', [({'cache': name}, stats['hit_rate']) for name, stats in caches.items()]),
+        ('image_prefilter_total', 'counter', 'Pre-filter outcomes by verdict and reason.',
+         [({'verdict': key.partition(':')[0], 'reason': key.partition(':')[2] or 'none'}, count) for key, count in prefilter['by_reason'].items()]),
+    ]
+    return families
+
+metrics_registry.add_collector(collect_component_metrics)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    token = app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f"Bearer {token}":
+        return jsonify({"message": "Not found."}), 404
+    return metrics_registry.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+health_db_probe = {'status': None, 'checked_at': 0.0}
+health_db_lock = threading.Lock()
+
+def health_db_status():
+    """Database status for /health; the connection probe runs at most once per HEALTH_DB_CHECK_TTL_SECONDS."""
+    if engine is None:
+        return "not_configured"
+    # Concurrent probes wait for the one in flight instead of each opening a connection.
+    with health_db_lock:
+        now = time.monotonic()
+        if health_db_probe['status'] and now - health_db_probe['checked_at'] < app.config['HEALTH_DB_CHECK_TTL_SECONDS']:
+            return health_db_probe['status']
         try:
             with engine.connect():
-                return {"status": "ok", "db_status": "connected"}
-        except:
-            return {"status": "ok", "db_status": "connection_error"}
-    return {"status": "ok", "db_status": "not_configured"}
+                status = "connected"
+        except Exception:
+            status = "connection_error"
+        health_db_probe.update(status=status, checked_at=time.monotonic())
+        return status
+
+@app.route('/health')
+def health_check():
+    return {
+        "status": "ok",
+        "db_status": health_db_status(),
+        "triage_cache": triage_cache.stats(),
+        "gemini": gemini_client.metrics(),
+        "drafts": draft_store.stats(),
+        "ledger_blocks": ledger_block_builder.stats(),
+        "audit_cache": audit_cache.stats(),
+        "photo_index": photo_index.stats(),
+        "image_prefilter": image_prefilter.stats()
+    }
 
 def initialize_database():
     """Initializes directories and ensures database tables are created."""
@@ -1260,11 +2794,12 @@ def initialize_database():
     # 2. Wait for DB and call init_db()
     if wait_for_db():
         init_db()
+        draft_store.start()
+        if app.config['LEDGER_COMMIT_MODE'] == 'block':
+            ledger_block_builder.start()
     else:
         # If DB connection fails after retries, log a severe error
-        print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-        print("FATAL ERROR: APPLICATION IS STARTING WITHOUT DATABASE CONNECTION.")
-        print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+        logger.critical("Application is starting without a database connection")
 
 # CRITICAL FOR GUNICORN/RENDER DEPLOYMENT: 
 # The function is called here (outside of the __main__ guard) 
@@ -0,0 +1,66 @@
+import hashlib
+import threading
+
+from triage_cache import MemoryCacheBackend
+
+
+class AuditResponseCache:
+    """
+    Per-worker cache of rendered public audit responses.
+
+    Every entry remembers the grievance fingerprint (status, resolved_at) it
+    was rendered from. Callers look entries up with the fingerprint they just
+    read, so a resolve, delete or restore handled by another worker changes the
+    fingerprint and turns the stale entry into a miss; invalidate() only frees
+    the local copy early.
+    """
+
+    def __init__(self, max_entries=4096, ttl=3600):
+        self.backend = MemoryCacheBackend(max_entries=max_entries)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.invalidations = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def render(fingerprint, body, last_modified):
+        return {
+            'fingerprint': fingerprint,
+            'body': body,
+            'etag': hashlib.sha256(body).hexdigest()[:32],
+            'last_modified': last_modified,
+        }
+
+    def get(self, complaint_id, fingerprint):
+        entry = self.backend.get(complaint_id)
+        with self.lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry['fingerprint'] != fingerprint:
+                self.stale += 1
+                self.misses += 1
+                return None
+            self.hits += 1
+        return entry
+
+    def put(self, complaint_id, entry):
+        self.backend.set(complaint_id, entry, self.ttl)
+
+    def invalidate(self, complaint_id):
+        self.backend.delete(complaint_id)
+        with self.lock:
+            self.invalidations += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,116 @@
+"""
+How many vision-model calls the local image pre-filter settles on a corpus.
+
+Every file under the given directories is run through the same steps as a
+resolution photo (ImagePrefilter.check, then reused-photo detection against
+the photos seen so far). With --synthetic, each real image also gets the
+degraded variants the pre-filter targets (blank frame, thumbnail-sized,
+heavily blurred, re-encoded copy), so the sample shows both sides:
+
+    python benchmarks/prefilter.py uploads "Prototype Outputs" --synthetic
+
+No database or model access is needed; thresholds default to the app config
+defaults and can be overridden with the same flags.
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+from PIL import Image, ImageFilter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_prefilter import MODEL, REJECT, ImagePrefilter  # noqa: E402
+from phash_index import PerceptualIndex, fingerprint_to_hex, image_fingerprint  # noqa: E402
+
+
+def corpus_files(directories):
+    for directory in directories:
+        for root, _, names in os.walk(directory):
+            for name in sorted(names):
+                yield os.path.join(root, name)
+
+
+def encoded(img, image_format='JPEG', quality=85):
+    buffer = io.BytesIO()
+    img.convert('RGB').save(buffer, format=image_format, quality=quality)
+    buffer.seek(0)
+    return buffer
+
+
+def synthetic_variants(path):
+    """Degraded copies of a real photo, labelled with the outcome they should get."""
+    try:
+        with Image.open(path) as original:
+            img = original.convert('RGB')
+    except Exception:
+        return []
+    small = img.copy()
+    small.thumbnail((48, 48))
+    return [
+        ('blank frame', encoded(Image.new('RGB', img.size, (12, 12, 12)))),
+        ('thumbnail-sized', encoded(small)),
+        ('heavily blurred', encoded(img.filter(ImageFilter.GaussianBlur(max(img.size) / 40)))),
+        ('re-encoded copy', encoded(img.resize((img.width * 3 // 4, img.height * 3 // 4)), quality=60)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('directories', nargs='*', default=['uploads'])
+    parser.add_argument('--synthetic', action='store_true', help="Add degraded variants of every real image.")
+    parser.add_argument('--min-edge', type=int, default=64)
+    parser.add_argument('--min-stddev', type=float, default=4.0)
+    parser.add_argument('--min-entropy', type=float, default=2.0)
+    parser.add_argument('--min-sharpness', type=float, default=5.0)
+    parser.add_argument('--max-distance', type=int, default=6)
+    args = parser.parse_args()
+
+    prefilter = ImagePrefilter(
+        min_edge=args.min_edge, min_stddev=args.min_stddev,
+        min_entropy=args.min_entropy, min_sharpness=args.min_sharpness
+    )
+    seen = []
+    index = PerceptualIndex(lambda last_id: seen[last_id:], max_distance=args.max_distance)
+
+    samples = []
+    for path in corpus_files(args.directories):
+        with open(path, 'rb') as source:
+            samples.append((os.path.relpath(path), io.BytesIO(source.read())))
+        if args.synthetic:
+            samples.extend((f"{os.path.relpath(path)} [{label}]", data) for label, data in synthetic_variants(path))
+    if not samples:
+        sys.exit("No files found in the given directories.")
+
+    started = time.perf_counter()
+    for label, data in samples:
+        verdict, reason, _ = prefilter.check(data, require_image=True)
+        if verdict != REJECT:
+            fingerprint = image_fingerprint(data)
+            if fingerprint and index.find(fingerprint):
+                verdict, reason = REJECT, 'reused_photo'
+            elif fingerprint:
+                seen.append(SimpleNamespace(
+                    id=len(seen) + 1, grievance_id=None, file_type='image',
+                    dhash=fingerprint_to_hex(fingerprint[0]), phash=fingerprint_to_hex(fingerprint[1])
+                ))
+        prefilter.record(verdict, reason)
+        print(f"{verdict:>6} {reason or '':<16} {label}")
+    elapsed = time.perf_counter() - started
+
+    stats = prefilter.stats()
+    print()
+    print(f"files checked      {stats['checked']}")
+    for key, count in sorted(stats['by_reason'].items()):
+        print(f"  {key:<24} {count}")
+    print(f"model calls avoided {stats['settled_locally']}/{stats['checked']} ({stats['settled_rate'] * 100:.1f}%)")
+    print(f"local check cost   {elapsed / len(samples) * 1000:.1f} ms/file")
+    if stats['by_reason'].get(MODEL) is None:
+        print("note: nothing reached the model; the corpus has no fresh usable photos")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Local stand-in for the Gemini generateContent endpoint.
+
+Answers every schema the app sends (triage, combined triage, vision
+validation, CV audit) by filling the request's responseSchema, so no real
+model or API key is needed. Latency and failures can be injected:
+
+    python benchmarks/stub_gemini.py --port 8765 --latency-ms 400 --jitter-ms 150 --error-rate 0.02
+
+then start the app with GEMINI_API_URL=http://127.0.0.1:8765/generate and any
+GEMINI_API_KEY. benchmarks/loadtest.py starts one in-process by default.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Keyword -> (classification, department_id), mirroring the categories in TRIAGE_SYSTEM_INSTRUCTION.
+CATEGORIES = [
+    (('water', 'leak', 'pipe', 'tap'), ('Water Supply & Leakage', 'WTR_002')),
+    (('dog', 'stray'), ('Stray Dog Menace', 'HIN_002')),
+    (('light', 'lamp', 'electric', 'power'), ('Electrical (Streetlight Outage)', 'ENG_001')),
+    (('road', 'pothole', 'crack'), ('Road Maintenance (Pothole)', 'ENG_001')),
+]
+DEFAULT_CATEGORY = ('General Municipal Service', 'ADM_003')
+
+
+class StubGemini:
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, timeout_rate=0.0,
+                 timeout_seconds=60.0, score=0.9, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self.score = score
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {'requests': 0, 'errors': 0, 'timeouts': 0}
+
+    def roll(self):
+        with self.lock:
+            self.counts['requests'] += 1
+            draw = self.random.random()
+            delay = max(0.0, self.random.gauss(self.latency_ms, self.jitter_ms)) / 1000 if self.jitter_ms else self.latency_ms / 1000
+            if draw < self.timeout_rate:
+                self.counts['timeouts'] += 1
+                return 'timeout', self.timeout_seconds
+            if draw < self.timeout_rate + self.error_rate:
+                self.counts['errors'] += 1
+                return 'error', delay
+            return 'ok', delay
+
+    def answer(self, payload):
+        """A response object matching the request's responseSchema."""
+        properties = payload.get('generationConfig', {}).get('responseSchema', {}).get('properties', {})
+        prompt = ' '.join(part.get('text', '') for part in payload.get('contents', [{}])[0].get('parts', [])).lower()
+        classification, department_id = next(
+            (category for keywords, category in CATEGORIES if any(word in prompt for word in keywords)), DEFAULT_CATEGORY
+        )
+        values = {
+            'classification': classification,
+            'department_id': department_id,
+            'raw_text_processed': 'Citizen reports an issue at the given location.',
+            'professional_text': f'{classification} reported; field inspection requested.',
+            'score': self.score,
+            'message': 'Stub validation.',
+            'visual_relevance_score': self.score,
+            'visual_message': 'Stub validation.',
+        }
+        return {name: values.get(name, '') for name in properties}
+
+    def handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                outcome, delay = stub.roll()
+                time.sleep(delay)
+                if outcome != 'ok':
+                    self.send_response(503)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                text = json.dumps(stub.answer(payload))
+                body = json.dumps({'candidates': [{'content': {'parts': [{'text': text}]}}]}).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def serve(self, host='127.0.0.1', port=0):
+        """Starts serving on a daemon thread and returns the server; port 0 picks a free port."""
+        server = ThreadingHTTPServer((host, port), self.handler())
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='stub-gemini', daemon=True).start()
+        return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Mean response latency.')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Standard deviation of the latency.')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of calls answered with 503.')
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help='Fraction of calls that hang for --timeout-seconds.')
+    parser.add_argument('--timeout-seconds', type=float, default=60.0)
+    parser.add_argument('--score', type=float, default=0.9, help='Score returned by vision and CV checks.')
+    args = parser.parse_args()
+
+    stub = StubGemini(args.latency_ms, args.jitter_ms, args.error_rate, args.timeout_rate, args.timeout_seconds, args.score)
+    server = stub.serve(args.host, args.port)
+    print(f"Stub Gemini listening on http://{args.host}:{server.server_port}/generate")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
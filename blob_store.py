@@ -0,0 +1,205 @@
+"""
+Content-addressed storage for uploaded attachments.
+
+A blob lives at <root>/<sha[:2]>/<sha[2:4]>/<sha><ext>, so identical bytes
+are stored once however often they are uploaded, and a stored blob never
+changes. Blobs are written to a temporary file in the store and renamed into
+place, so readers never see a partial file and two concurrent writers of the
+same content both end up pointing at one complete blob. Blobs are not
+refcounted on disk: Attachment rows are the references, and `flask blobs-gc`
+removes blobs nothing points at. Attachment rows record a blob by its key,
+the path relative to the store root ('ab/cd/<sha><ext>'), so the store can
+move without rewriting rows and server paths never reach API responses.
+
+Uploads reach the store in a single pass: HashingSpoolFile is the spool the
+form parser writes each uploaded file into, on disk in the store's directory,
+hashing the bytes as they arrive. Storing the upload is then just a rename,
+and the image preprocessor reads the spool from disk instead of memory.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+
+from werkzeug.utils import secure_filename
+
+DEFAULT_BLOB_ROOT = os.path.join('uploads', 'blobs')
+
+# A relative BLOB_STORE_ROOT is taken relative to the application directory, whatever the working directory.
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+CHUNK_SIZE = 1024 * 1024
+
+BLOB_NAME = re.compile(r'^([0-9a-f]{64})(\.[a-z0-9]+)?$')
+BLOB_KEY = re.compile(r'^([0-9a-f]{2})/([0-9a-f]{2})/([0-9a-f]{64})(\.[a-z0-9]+)?$')
+
+# Extensions a blob may be stored under. Blobs are served back with a content
+# type guessed from the extension, so anything a browser would render as a
+# page (.html, .svg, .xml, ...) is stored without one and served as bytes.
+BLOB_EXTENSIONS = frozenset({
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.heic', '.heif',
+    '.mp4', '.m4v', '.mov', '.webm', '.3gp',
+})
+
+
+def blob_store_root(base_dir=PROJECT_ROOT):
+    """The BLOB_STORE_ROOT directory as an absolute path, shared by the app and the migrations."""
+    return os.path.join(base_dir, os.getenv('BLOB_STORE_ROOT', DEFAULT_BLOB_ROOT))
+
+
+def is_blob_key(value):
+    match = BLOB_KEY.match(value or '')
+    return bool(match) and match.group(3).startswith(match.group(1) + match.group(2))
+
+
+def blob_extension(filename, content_type=None):
+    """Extension for a blob, from the declared content type first so renamed copies still dedup; '' unless allowlisted."""
+    extension = mimetypes.guess_extension(content_type) if content_type else None
+    if not extension:
+        extension = os.path.splitext(secure_filename(filename or ''))[1]
+    extension = extension.lower()
+    return extension if extension in BLOB_EXTENSIONS else ''
+
+
+def stream_sha256(file_obj, chunk_size=CHUNK_SIZE):
+    file_obj.seek(0)
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file_obj.read(chunk_size), b''):
+        digest.update(chunk)
+    file_obj.seek(0)
+    return digest.hexdigest()
+
+
+def upload_sha256(file_obj):
+    """SHA-256 of an upload: already known if it was spooled through a HashingSpoolFile, else one streaming read."""
+    spool = getattr(file_obj, 'stream', file_obj)
+    if isinstance(spool, HashingSpoolFile) and spool.digest is not None:
+        return spool.digest.hexdigest()
+    return stream_sha256(file_obj)
+
+
+class HashingSpoolFile:
+    """
+    Writable, readable upload spool that hashes everything written to it.
+
+    Only sequential writes are hashed; a write anywhere but the end drops the
+    digest, and callers fall back to reading the file. An uncommitted spool
+    deletes its temp file on close.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        self.file = os.fdopen(fd, 'w+b')
+        self.digest = hashlib.sha256()
+        self.hashed_bytes = 0
+        self.bytes_written = 0
+        self.committed = False
+
+    def write(self, data):
+        if self.digest is not None and self.file.tell() == self.hashed_bytes:
+            self.digest.update(data)
+            self.hashed_bytes += len(data)
+        else:
+            self.digest = None
+        self.bytes_written += len(data)
+        return self.file.write(data)
+
+    def close(self):
+        self.file.close()
+        if not self.committed and os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+    def __iter__(self):
+        return iter(self.file)
+
+
+def blob_sha256(path):
+    """The SHA-256 encoded in a blob's file name, or None if `path` is not a blob."""
+    match = BLOB_NAME.match(os.path.basename(path))
+    return match.group(1) if match else None
+
+
+class BlobStore:
+    def __init__(self, root=DEFAULT_BLOB_ROOT):
+        self.root = root
+
+    def path_for(self, sha256, extension=''):
+        return os.path.join(self.root, sha256[:2], sha256[2:4], f"{sha256}{extension}")
+
+    def key_for(self, path):
+        """The store-relative key recorded for a blob path."""
+        return os.path.relpath(path, self.root).replace(os.sep, '/')
+
+    def resolve(self, stored_path):
+        """Filesystem path for a stored attachment path; anything but a blob key is returned unchanged."""
+        if is_blob_key(stored_path):
+            return os.path.join(self.root, *stored_path.split('/'))
+        return stored_path
+
+    def put_file(self, file_obj, extension=''):
+        """
+        Streams `file_obj` into the store, hashing it on the way.
+        Returns (path, sha256, created); created is False when the content was already stored.
+        """
+        spool = getattr(file_obj, 'stream', file_obj)
+        if self.can_adopt(spool):
+            return self.adopt(spool, extension)
+        os.makedirs(self.root, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in iter(lambda: file_obj.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            return self.commit(tmp_path, digest.hexdigest(), extension)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def can_adopt(self, spool):
+        return (
+            isinstance(spool, HashingSpoolFile) and spool.digest is not None and not spool.committed
+            and os.path.dirname(os.path.abspath(spool.path)) == os.path.abspath(self.root)
+        )
+
+    def adopt(self, spool, extension=''):
+        """Moves an already hashed spool into place; its open handle stays readable."""
+        spool.flush()
+        path, sha256, created = self.commit(spool.path, spool.digest.hexdigest(), extension)
+        spool.committed = True
+        return path, sha256, created
+
+    def put_path(self, source_path, extension=''):
+        with open(source_path, 'rb') as source:
+            return self.put_file(source, extension)
+
+    def commit(self, tmp_path, sha256, extension):
+        path = self.path_for(sha256, extension)
+        if os.path.exists(path):
+            os.unlink(tmp_path)
+            # A fresh mtime keeps blobs-gc off a blob whose new reference is not committed yet.
+            os.utime(path)
+            return path, sha256, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+        return path, sha256, True
+
+    def iter_blobs(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if BLOB_NAME.match(name):
+                    yield os.path.join(dirpath, name)
+
+    def delete(self, path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
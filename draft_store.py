@@ -0,0 +1,204 @@
+import atexit
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, case, select
+
+logger = logging.getLogger(__name__)
+
+
+def draft_content_hash(raw_text, location):
+    return hashlib.sha256(f"{raw_text}\x1f{location}".encode('utf-8')).hexdigest()
+
+
+# How far back each flush looks for tombstones written by other workers.
+TOMBSTONE_LOOKBACK = timedelta(seconds=60)
+
+
+def is_tombstone(raw_text, location):
+    return raw_text is None and location is None
+
+
+def draft_upsert(conn, table, rows):
+    """
+    Batched INSERT ... ON CONFLICT(user_id) DO UPDATE in the active dialect's syntax.
+
+    A stored row is only overwritten by a row with a newer saved_at, so a
+    worker flushing an old buffer cannot undo a newer save or a delete
+    tombstone written by another worker.
+    """
+    dialect = conn.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(rows)
+        newer = table.c.saved_at < stmt.inserted.saved_at
+        # MySQL applies the assignments left to right, so saved_at has to come last.
+        conn.execute(stmt.on_duplicate_key_update([
+            ('raw_text', case((newer, stmt.inserted.raw_text), else_=table.c.raw_text)),
+            ('location', case((newer, stmt.inserted.location), else_=table.c.location)),
+            ('saved_at', case((newer, stmt.inserted.saved_at), else_=table.c.saved_at)),
+        ]))
+        return
+    else:
+        raise ValueError(f"Draft upsert is not implemented for {dialect}.")
+    stmt = insert(table).values(rows)
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id],
+        set_={'raw_text': stmt.excluded.raw_text, 'location': stmt.excluded.location, 'saved_at': stmt.excluded.saved_at},
+        where=table.c.saved_at < stmt.excluded.saved_at
+    ))
+
+
+class DraftStore:
+    """
+    Per-worker write-behind buffer for draft autosaves.
+
+    Saves land in memory and are flushed as one batched upsert every
+    `flush_interval` seconds (and at interpreter exit). A save whose content
+    hash matches the last one seen for that user is dropped. Loads are served
+    from the buffer first, so the saving worker always sees its latest draft;
+    other workers see it after the next flush.
+
+    A delete writes a tombstone row (raw_text and location NULL) instead of
+    removing the row, and the upsert only replaces older rows, so a draft
+    still buffered on another worker cannot come back after a delete. Each
+    flush also drops remembered hashes that a newer tombstone has replaced;
+    until then, that worker can still skip an identical save made within one
+    flush interval of a delete on another worker.
+    """
+
+    def __init__(self, app, db, model, flush_interval=5.0, max_tracked_users=50000):
+        self.app = app
+        self.db = db
+        self.table = model.__table__
+        self.flush_interval = flush_interval
+        self.max_tracked_users = max_tracked_users
+        self.dirty = {}
+        self.known_hashes = OrderedDict()
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.flusher = None
+        self.saves = 0
+        self.skipped_unchanged = 0
+        self.rows_flushed = 0
+        self.flushes = 0
+
+    def start(self):
+        if self.flusher is None:
+            self.flusher = threading.Thread(target=self.run_flusher, name='draft-flusher', daemon=True)
+            self.flusher.start()
+            atexit.register(self.shutdown)
+
+    def run_flusher(self):
+        while not self.stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Draft flush failed")
+
+    def shutdown(self):
+        self.stop_event.set()
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Draft flush on shutdown failed")
+
+    def remember_hash(self, user_id, content_hash, saved_at):
+        self.known_hashes[user_id] = (content_hash, saved_at)
+        self.known_hashes.move_to_end(user_id)
+        while len(self.known_hashes) > self.max_tracked_users:
+            self.known_hashes.popitem(last=False)
+
+    def save(self, user_id, raw_text, location):
+        """Buffers a draft and returns its saved_at; unchanged content keeps the previous timestamp."""
+        # NULL text and location together mark a tombstone.
+        raw_text = '' if raw_text is None else raw_text
+        location = '' if location is None else location
+        content_hash = draft_content_hash(raw_text, location)
+        with self.lock:
+            self.saves += 1
+            known = self.known_hashes.get(user_id)
+            if known and known[0] == content_hash:
+                self.skipped_unchanged += 1
+                return known[1]
+            saved_at = datetime.now()
+            self.dirty[user_id] = {'user_id': user_id, 'raw_text': raw_text, 'location': location, 'saved_at': saved_at}
+            self.remember_hash(user_id, content_hash, saved_at)
+            return saved_at
+
+    def load(self, user_id):
+        with self.lock:
+            entry = self.dirty.get(user_id)
+            return dict(entry) if entry else None
+
+    def delete(self, user_id):
+        """Drops the buffered draft and tombstones the stored one; returns True if either existed."""
+        with self.flush_lock:
+            with self.lock:
+                buffered = self.dirty.pop(user_id, None) is not None
+                self.known_hashes.pop(user_id, None)
+            with self.app.app_context():
+                with self.db.engine.begin() as conn:
+                    stored = conn.execute(
+                        select(self.table.c.raw_text, self.table.c.location).where(self.table.c.user_id == user_id)
+                    ).first()
+                    draft_upsert(conn, self.table, [{'user_id': user_id, 'raw_text': None, 'location': None, 'saved_at': datetime.now()}])
+        return buffered or (stored is not None and not is_tombstone(*stored))
+
+    def forget_tombstoned(self, conn):
+        """Drops remembered hashes older than a tombstone another worker wrote recently."""
+        rows = conn.execute(
+            select(self.table.c.user_id, self.table.c.saved_at).where(and_(
+                self.table.c.raw_text.is_(None), self.table.c.location.is_(None),
+                self.table.c.saved_at >= datetime.now() - TOMBSTONE_LOOKBACK
+            ))
+        ).all()
+        with self.lock:
+            for user_id, deleted_at in rows:
+                known = self.known_hashes.get(user_id)
+                if known and known[1] < deleted_at:
+                    del self.known_hashes[user_id]
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                batch, self.dirty = self.dirty, {}
+                tracking = bool(self.known_hashes)
+            if not batch and not tracking:
+                return 0
+            try:
+                with self.app.app_context():
+                    with self.db.engine.begin() as conn:
+                        if batch:
+                            draft_upsert(conn, self.table, list(batch.values()))
+                        if tracking:
+                            self.forget_tombstoned(conn)
+            except Exception:
+                # Put the batch back unless a newer save for the same user arrived meanwhile.
+                with self.lock:
+                    for user_id, entry in batch.items():
+                        self.dirty.setdefault(user_id, entry)
+                raise
+            if batch:
+                with self.lock:
+                    self.rows_flushed += len(batch)
+                    self.flushes += 1
+            return len(batch)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "saves": self.saves,
+                "skipped_unchanged": self.skipped_unchanged,
+                "buffered": len(self.dirty),
+                "flushes": self.flushes,
+                "rows_flushed": self.rows_flushed,
+            }
@@ -0,0 +1,181 @@
+import json
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised without touching the network while the breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker. After `failure_threshold` failures in a row the
+    circuit opens for `reset_seconds`; the first call after that is let through
+    as a trial and either closes the circuit or re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_seconds=30):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return 'closed'
+            if time.monotonic() - self.opened_at >= self.reset_seconds:
+                return 'half_open'
+            return 'open'
+
+    def allow_request(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_seconds or self.trial_in_flight:
+                return False
+            self.trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.consecutive_failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.consecutive_failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.circuit_rejections = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def snapshot(self):
+        completed = self.calls - self.circuit_rejections
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "circuit_rejections": self.circuit_rejections,
+            "latency_avg_ms": round(self.latency_total / completed * 1000, 1) if completed else 0.0,
+            "latency_max_ms": round(self.latency_max * 1000, 1),
+        }
+
+
+class GeminiClient:
+    """
+    Shared HTTP client for every generateContent call.
+
+    One pooled keep-alive session per process, explicit connect/read timeouts,
+    bounded retries with full-jitter backoff on 429/5xx and transport errors,
+    and a circuit breaker so a dead upstream fails fast instead of pinning workers.
+    """
+
+    def __init__(self, api_url, connect_timeout=5.0, read_timeout=30.0, max_retries=2,
+                 backoff_base=0.5, backoff_max=8.0, breaker_threshold=5,
+                 breaker_reset_seconds=30, pool_size=10, latency_observer=None):
+        self.api_url = api_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset_seconds)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Content-Type': 'application/json'})
+        self.endpoint_metrics = {}
+        # Optional callable(endpoint, seconds), e.g. to feed a latency histogram.
+        self.latency_observer = latency_observer
+        self.metrics_lock = threading.Lock()
+
+    def backoff_delay(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def record(self, endpoint, **increments):
+        with self.metrics_lock:
+            metrics = self.endpoint_metrics.setdefault(endpoint, EndpointMetrics())
+            for name, value in increments.items():
+                if name == 'latency':
+                    metrics.latency_total += value
+                    metrics.latency_max = max(metrics.latency_max, value)
+                else:
+                    setattr(metrics, name, getattr(metrics, name) + value)
+
+    def generate_content(self, payload, api_key, endpoint):
+        """POSTs a generateContent payload and returns the decoded JSON body, raising RequestException on failure."""
+        self.record(endpoint, calls=1)
+        if not self.breaker.allow_request():
+            self.record(endpoint, circuit_rejections=1)
+            raise CircuitOpenError("Gemini circuit breaker is open; skipping model call.")
+
+        body = json.dumps(payload)
+        started = time.perf_counter()
+        attempt = 0
+        breaker_recorded = False
+        try:
+            while True:
+                response = None
+                try:
+                    response = self.session.post(self.api_url, params={'key': api_key}, data=body, timeout=self.timeout)
+                    if response.status_code not in RETRYABLE_STATUS_CODES:
+                        # Any non-retryable answer (even a 4xx) proves the upstream is reachable.
+                        self.breaker.record_success()
+                        breaker_recorded = True
+                        response.raise_for_status()
+                        return response.json()
+                    error = requests.exceptions.HTTPError(f"{response.status_code} from Gemini", response=response)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    if isinstance(e, requests.exceptions.Timeout):
+                        self.record(endpoint, timeouts=1)
+                    error = e
+
+                if attempt >= self.max_retries:
+                    self.breaker.record_failure()
+                    breaker_recorded = True
+                    raise error
+                time.sleep(self.backoff_delay(attempt, response))
+                attempt += 1
+                self.record(endpoint, retries=1)
+        except BaseException:
+            self.record(endpoint, errors=1)
+            # Any other failure (a broken body, redirect loop, interrupt...) still settles the call,
+            # otherwise a half-open trial would stay in flight and block every later request.
+            if not breaker_recorded:
+                self.breaker.record_failure()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.record(endpoint, latency=elapsed)
+            if self.latency_observer is not None:
+                self.latency_observer(endpoint, elapsed)
+
+    def metrics(self):
+        with self.metrics_lock:
+            endpoints = {name: m.snapshot() for name, m in self.endpoint_metrics.items()}
+        return {"circuit_state": self.breaker.state, "endpoints": endpoints}
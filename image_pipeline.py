@@ -0,0 +1,104 @@
+import base64
+import io
+import os
+import tempfile
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Multiple of 3 so each chunk encodes without padding and the pieces concatenate into valid base64.
+BASE64_CHUNK_SIZE = 3 * 64 * 1024
+
+MIME_TYPES = {'JPEG': 'image/jpeg', 'WEBP': 'image/webp'}
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+# What Pillow raises for uploads it cannot (or must not) decode as an image.
+DECODE_ERRORS = (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError)
+
+
+def file_size(file_obj):
+    position = file_obj.tell()
+    file_obj.seek(0, os.SEEK_END)
+    size = file_obj.tell()
+    file_obj.seek(position)
+    return size
+
+
+def downscale_image(file_obj, max_edge=1280, image_format='JPEG', quality=80):
+    """
+    Decodes an upload, applies its EXIF orientation, shrinks it so the longest
+    edge is at most `max_edge` and re-encodes it. Returns a BytesIO at offset 0.
+
+    JPEGs are decoded in draft mode, which lets libjpeg scale down during the
+    DCT instead of materializing the full-resolution bitmap first.
+    """
+    file_obj.seek(0)
+    with Image.open(file_obj) as original:
+        original.draft('RGB', (max_edge, max_edge))
+        img = ImageOps.exif_transpose(original)
+        img.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        encoded = io.BytesIO()
+        img.save(encoded, format=image_format, quality=quality, optimize=True)
+    encoded.seek(0)
+    return encoded
+
+
+def stream_base64(file_obj, chunk_size=BASE64_CHUNK_SIZE):
+    """Yields the base64 encoding of file_obj chunk by chunk instead of reading it whole."""
+    file_obj.seek(0)
+    while True:
+        chunk = file_obj.read(chunk_size)
+        if not chunk:
+            break
+        yield base64.b64encode(chunk).decode('ascii')
+
+
+def encode_image_for_model(file_obj, max_edge=1280, image_format='JPEG', quality=80, passthrough_max_bytes=4 * 1024 * 1024):
+    """
+    Returns the base64 payload sent to the vision model for an uploaded image.
+
+    Decodable images are downscaled and re-encoded first, so the payload size
+    depends on `max_edge` rather than on the upload. Files Pillow cannot decode
+    are passed through unchanged only up to `passthrough_max_bytes`.
+    The file position is reset to 0 afterwards so callers can still save it.
+    """
+    try:
+        prepared = downscale_image(file_obj, max_edge, image_format, quality)
+    except DECODE_ERRORS as e:
+        if file_size(file_obj) > passthrough_max_bytes:
+            raise ValueError(f"Upload is not a decodable image and exceeds {passthrough_max_bytes} bytes: {e}")
+        prepared = file_obj
+    encoded = "".join(stream_base64(prepared))
+    file_obj.seek(0)
+    return encoded
+
+
+def derivative_path(derivatives_root, source_sha256, size_name, image_format):
+    """Content-addressed location of a derivative: the same source bytes always map to the same file."""
+    return os.path.join(
+        derivatives_root, source_sha256[:2], f"{source_sha256}_{size_name}.{EXTENSIONS[image_format]}"
+    )
+
+
+def ensure_derivative(source_path, dest_path, max_edge, image_format='WEBP', quality=80):
+    """
+    Renders `source_path` downscaled to `max_edge` into `dest_path` unless it
+    already exists. Written to a temporary file and renamed into place, so
+    concurrent requests for the same derivative never see a partial file.
+    Raises the same decode errors as downscale_image for non-images.
+    """
+    if os.path.exists(dest_path):
+        return False
+    with open(source_path, 'rb') as source:
+        encoded = downscale_image(source, max_edge, image_format, quality)
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest_path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(encoded.getbuffer())
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return True
@@ -0,0 +1,97 @@
+"""
+CPU-only checks that settle obvious photo uploads before any model call.
+
+An upload is rejected when it cannot be decoded, is too small, is a
+near-uniform frame (lens cap, blank screen), carries almost no information
+(low histogram entropy) or is too blurred to show anything (low variance of
+the Laplacian). Non-image media on a citizen complaint is passed through
+without a vision check, since the vision model only scores photos.
+Everything else goes to the model. Thresholds come from the constructor so
+they can be tuned from app config, and every outcome is counted by reason.
+"""
+import threading
+
+from PIL import Image, ImageFilter, ImageOps, ImageStat
+
+from image_pipeline import DECODE_ERRORS
+
+REJECT = 'reject'
+PASS = 'pass'
+MODEL = 'model'
+
+# Checks run on a copy no larger than this, so cost does not grow with the upload's resolution.
+ANALYSIS_EDGE = 512
+
+LAPLACIAN = ImageFilter.Kernel((3, 3), [0, 1, 0, 1, -4, 1, 0, 1, 0], scale=1, offset=128)
+
+
+class ImagePrefilter:
+    def __init__(self, enabled=True, min_edge=64, min_stddev=4.0, min_entropy=2.0, min_sharpness=5.0):
+        self.enabled = enabled
+        self.min_edge = min_edge
+        self.min_stddev = min_stddev
+        self.min_entropy = min_entropy
+        self.min_sharpness = min_sharpness
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def measure(self, file_obj):
+        """Decodes the upload and returns its (width, height, stddev, entropy, sharpness). Leaves the file at offset 0."""
+        file_obj.seek(0)
+        try:
+            with Image.open(file_obj) as original:
+                width, height = original.size
+                original.draft('L', (ANALYSIS_EDGE, ANALYSIS_EDGE))
+                gray = ImageOps.exif_transpose(original).convert('L')
+                # Force a full decode so truncated files fail here rather than in the model call.
+                gray.load()
+        finally:
+            file_obj.seek(0)
+        gray.thumbnail((ANALYSIS_EDGE, ANALYSIS_EDGE))
+        stddev = ImageStat.Stat(gray).stddev[0]
+        # Pillow leaves the outermost pixels unfiltered, so they are cropped off before measuring.
+        edges = gray.filter(LAPLACIAN).crop((1, 1, gray.width - 1, gray.height - 1))
+        sharpness = ImageStat.Stat(edges).var[0]
+        return width, height, stddev, gray.entropy(), sharpness
+
+    def check(self, file_obj, content_type=None, require_image=False):
+        """
+        Returns (verdict, reason, message): REJECT and PASS settle the upload
+        locally, MODEL means it still needs the vision model.
+        """
+        if not self.enabled:
+            return MODEL, None, None
+        is_media = bool(content_type) and content_type.split('/')[0] in ('video', 'audio')
+        if is_media and not require_image:
+            return PASS, 'non_image_media', "Video/audio evidence is not scored by the vision model."
+        try:
+            width, height, stddev, entropy, sharpness = self.measure(file_obj)
+        except DECODE_ERRORS:
+            return REJECT, 'undecodable', "The upload is not a readable image."
+        if min(width, height) < self.min_edge:
+            return REJECT, 'too_small', f"Image is {width}x{height}; at least {self.min_edge}px per side is required."
+        if stddev < self.min_stddev:
+            return REJECT, 'uniform_frame', "Image is a near-uniform frame with nothing visible."
+        if entropy < self.min_entropy:
+            return REJECT, 'low_entropy', f"Image carries too little detail (entropy {entropy:.2f} bits)."
+        if sharpness < self.min_sharpness:
+            return REJECT, 'blurred', f"Image is too blurred to verify (sharpness {sharpness:.1f})."
+        return MODEL, None, None
+
+    def record(self, verdict, reason=None):
+        key = f"{verdict}:{reason}" if reason else verdict
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def stats(self):
+        with self.lock:
+            counts = dict(self.counts)
+        total = sum(counts.values())
+        sent = counts.get(MODEL, 0)
+        return {
+            "checked": total,
+            "settled_locally": total - sent,
+            "sent_to_model": sent,
+            "settled_rate": round((total - sent) / total, 4) if total else 0.0,
+            "by_reason": counts,
+        }
@@ -0,0 +1,231 @@
+"""
+Hash chain and Merkle helpers for the resolution ledger.
+
+Every ledger entry commits to the previous entry's hash, so rewriting any
+past entry breaks every later link. Fixed windows of entries are also rolled
+up into Merkle checkpoints, which lets a single complaint be proven against a
+published root with O(log n) sibling hashes instead of replaying the chain.
+Leaves and inner nodes are hashed with different prefixes so an inner node
+can never be passed off as a leaf.
+
+In block mode resolutions are first recorded as pending receipts and a
+BlockBuilder seals them onto the chain in batches, one Merkle block per
+transaction, so officers do not queue on the ledger head one entry at a time.
+"""
+import atexit
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+
+GENESIS_HASH = '0' * 64
+
+logger = logging.getLogger(__name__)
+
+
+def sha256_hex(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def compute_entry_hash(prev_hash, sequence, complaint_id, officer_id, cv_score, is_fraudulent, photo_sha256, recorded_at):
+    canonical = json.dumps({
+        'prev_hash': prev_hash,
+        'sequence': sequence,
+        'complaint_id': complaint_id,
+        'officer_id': officer_id,
+        'cv_score': None if cv_score is None else round(float(cv_score), 6),
+        'is_fraudulent': bool(is_fraudulent),
+        'photo_sha256': photo_sha256,
+        'recorded_at': recorded_at.isoformat(),
+    }, sort_keys=True, separators=(',', ':'))
+    return sha256_hex(canonical.encode('utf-8'))
+
+
+def merkle_leaf(entry_hash):
+    return sha256_hex(b'\x00' + bytes.fromhex(entry_hash))
+
+
+def merkle_parent(left, right):
+    return sha256_hex(b'\x01' + bytes.fromhex(left) + bytes.fromhex(right))
+
+
+def merkle_levels(entry_hashes):
+    """All tree levels, leaves first. An odd node at the end of a level is promoted unchanged."""
+    level = [merkle_leaf(h) for h in entry_hashes]
+    levels = [level]
+    while len(level) > 1:
+        next_level = [merkle_parent(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            next_level.append(level[-1])
+        levels.append(next_level)
+        level = next_level
+    return levels
+
+
+def merkle_root(entry_hashes):
+    if not entry_hashes:
+        return GENESIS_HASH
+    return merkle_levels(entry_hashes)[-1][0]
+
+
+def merkle_proof(entry_hashes, index):
+    """Sibling path for entry_hashes[index] as a list of {'hash', 'side'} from the leaf up."""
+    proof = []
+    for level in merkle_levels(entry_hashes)[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append({'hash': level[sibling], 'side': 'left' if sibling < index else 'right'})
+        index //= 2
+    return proof
+
+
+def verify_merkle_proof(entry_hash, proof, root):
+    node = merkle_leaf(entry_hash)
+    for step in proof:
+        node = merkle_parent(step['hash'], node) if step['side'] == 'left' else merkle_parent(node, step['hash'])
+    return node == root
+
+
+def block_signature(signing_key, height, start_sequence, end_sequence, root, prev_root):
+    """HMAC-SHA256 over a block header with the key shared by every ledger writer; None when no key is set."""
+    if not signing_key:
+        return None
+    header = f"{height}:{start_sequence}:{end_sequence}:{root}:{prev_root}"
+    return hmac.new(signing_key.encode('utf-8'), header.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+class ChainVerifier:
+    """
+    Streaming verifier: feed entries in sequence order and it checks every
+    hash link, recomputes every entry hash and, at each checkpoint boundary,
+    the checkpoint's Merkle root. Memory is bounded by one checkpoint window.
+    """
+
+    def __init__(self, checkpoints, start_sequence=1, prev_hash=GENESIS_HASH, signing_key=None):
+        self.checkpoints = {cp.end_sequence: cp for cp in checkpoints}
+        self.signing_key = signing_key
+        self.expected_sequence = start_sequence
+        self.last_hash = prev_hash
+        self.window = []
+        self.entries_checked = 0
+        self.checkpoints_checked = 0
+        self.errors = []
+
+    def feed(self, entry):
+        if entry.sequence != self.expected_sequence:
+            self.errors.append(f"Sequence gap: expected {self.expected_sequence}, found {entry.sequence}.")
+        if entry.prev_hash != self.last_hash:
+            self.errors.append(f"Entry {entry.sequence} does not link to the previous entry's hash.")
+        recomputed = compute_entry_hash(
+            entry.prev_hash, entry.sequence, entry.complaint_id, entry.officer_id,
+            entry.cv_score, entry.is_fraudulent, entry.photo_sha256, entry.recorded_at
+        )
+        if recomputed != entry.entry_hash:
+            self.errors.append(f"Entry {entry.sequence} content does not match its stored hash.")
+
+        self.window.append(entry.entry_hash)
+        checkpoint = self.checkpoints.get(entry.sequence)
+        if checkpoint is not None:
+            window_size = checkpoint.end_sequence - checkpoint.start_sequence + 1
+            # A verification started mid-window cannot rebuild that first root; its entries are still hash-linked.
+            if len(self.window) >= window_size:
+                if merkle_root(self.window[-window_size:]) != checkpoint.merkle_root:
+                    self.errors.append(f"Checkpoint {checkpoint.start_sequence}-{checkpoint.end_sequence} root mismatch.")
+                self.checkpoints_checked += 1
+            if self.signing_key and checkpoint.signature:
+                expected = block_signature(
+                    self.signing_key, checkpoint.height, checkpoint.start_sequence,
+                    checkpoint.end_sequence, checkpoint.merkle_root, checkpoint.prev_root
+                )
+                if not hmac.compare_digest(expected, checkpoint.signature):
+                    self.errors.append(f"Checkpoint {checkpoint.start_sequence}-{checkpoint.end_sequence} signature mismatch.")
+            self.window = []
+
+        self.last_hash = entry.entry_hash
+        self.expected_sequence = entry.sequence + 1
+        self.entries_checked += 1
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+class BlockBuilder:
+    """
+    Per-worker thread that seals pending ledger receipts into blocks.
+
+    `seal_block(max_entries)` is called inside an app context and must chain
+    up to `max_entries` pending receipts in one transaction, returning how many
+    it sealed. The thread wakes every `max_latency` seconds, or as soon as this
+    worker has queued `block_size` receipts, and keeps sealing while full
+    blocks are available. Receipts queued by other workers are picked up by
+    whichever builder wakes first; the ledger head lock keeps them ordered.
+    """
+
+    def __init__(self, app, seal_block, block_size=64, max_latency=2.0):
+        self.app = app
+        self.seal_block = seal_block
+        self.block_size = block_size
+        self.max_latency = max_latency
+        self.queued = 0
+        self.lock = threading.Lock()
+        self.wake_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.blocks_sealed = 0
+        self.entries_sealed = 0
+        self.last_seal_ms = 0.0
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name='ledger-block-builder', daemon=True)
+            self.thread.start()
+            atexit.register(self.shutdown)
+
+    def notify(self, count=1):
+        with self.lock:
+            self.queued += count
+            if self.queued >= self.block_size:
+                self.wake_event.set()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.wake_event.wait(self.max_latency)
+            self.wake_event.clear()
+            try:
+                self.seal_pending()
+            except Exception:
+                logger.exception("Ledger block seal failed")
+
+    def seal_pending(self):
+        while True:
+            started = time.perf_counter()
+            with self.app.app_context():
+                sealed = self.seal_block(self.block_size)
+            with self.lock:
+                self.queued = max(0, self.queued - sealed)
+                if sealed:
+                    self.blocks_sealed += 1
+                    self.entries_sealed += sealed
+                    self.last_seal_ms = round((time.perf_counter() - started) * 1000, 1)
+            if sealed < self.block_size:
+                return
+
+    def shutdown(self):
+        self.stop_event.set()
+        self.wake_event.set()
+        try:
+            self.seal_pending()
+        except Exception:
+            logger.exception("Ledger block seal on shutdown failed")
+
+    def stats(self):
+        with self.lock:
+            return {
+                "queued_locally": self.queued,
+                "blocks_sealed": self.blocks_sealed,
+                "entries_sealed": self.entries_sealed,
+                "last_seal_ms": self.last_seal_ms,
+            }
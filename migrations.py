@@ -0,0 +1,264 @@
+"""
+Versioned schema migrations.
+
+Each migration is a function registered with @migration(version, description)
+and receives an open connection inside its own transaction plus the models'
+MetaData. Applied versions are recorded in the schema_migrations table, so
+every migration runs exactly once per database. Migrations must be safe on
+both a fresh database (where the baseline create_all already built the current
+models) and an existing one, which is why the helpers check before creating.
+"""
+import logging
+import os
+from datetime import datetime
+
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+
+from blob_store import PROJECT_ROOT, BlobStore, blob_extension, blob_sha256, blob_store_root, is_blob_key
+from ledger import GENESIS_HASH
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = []
+
+# Arbitrary constant key for pg_advisory_lock so concurrent gunicorn workers migrate one at a time.
+MIGRATION_LOCK_ID = 7295034
+
+migration_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations', migration_metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String(255), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+def migration(version, description):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return register
+
+
+def add_column_if_missing(conn, table_name, column):
+    existing = {c['name'] for c in inspect(conn).get_columns(table_name)}
+    if column.name in existing:
+        return
+    column_type = column.type.compile(dialect=conn.dialect)
+    conn.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {column.name} {column_type}'))
+
+
+def create_index_if_missing(conn, index):
+    if conn.dialect.name in ('postgresql', 'sqlite'):
+        # Reflection skips expression indexes, so checkfirst cannot see them; let the database check.
+        conn.execute(CreateIndex(index, if_not_exists=True))
+    else:
+        index.create(bind=conn, checkfirst=True)
+
+
+def applied_versions(conn):
+    return {row.version for row in conn.execute(select(schema_migrations.c.version))}
+
+
+def named_index(metadata, table_name, index_name):
+    return next(index for index in metadata.tables[table_name].indexes if index.name == index_name)
+
+
+@migration(1, "Baseline schema from the SQLAlchemy models")
+def create_baseline_tables(conn, metadata):
+    metadata.create_all(bind=conn)
+
+
+@migration(2, "Composite indexes for the hot grievance, proof and attachment lookups")
+def add_hot_path_indexes(conn, metadata):
+    for table_name, index_name in [
+        ('grievance', 'ix_grievance_user_created'),
+        ('grievance', 'ix_grievance_user_status'),
+        ('grievance', 'ix_grievance_officer_created'),
+        ('grievance', 'ix_grievance_officer_status'),
+        ('grievance', 'ix_grievance_status_created'),
+        ('grievance', 'ix_grievance_status_resolved'),
+        ('resolution_proof', 'ix_resolution_proof_grievance_id'),
+        ('attachment', 'ix_attachment_grievance_id'),
+        ('triage_job', 'ix_triage_job_status'),
+    ]:
+        create_index_if_missing(conn, named_index(metadata, table_name, index_name))
+
+
+@migration(3, "Precomputed seriousness and priority_score on grievance")
+def add_grievance_seriousness(conn, metadata):
+    grievance = metadata.tables['grievance']
+    add_column_if_missing(conn, 'grievance', grievance.c.seriousness)
+    add_column_if_missing(conn, 'grievance', grievance.c.priority_score)
+    create_index_if_missing(conn, named_index(metadata, 'grievance', 'ix_grievance_officer_seriousness'))
+
+
+@migration(4, "Shared complaint number counter for block-allocated complaint IDs")
+def add_complaint_sequence(conn, metadata):
+    sequence = metadata.tables['complaint_sequence']
+    grievance = metadata.tables['grievance']
+    sequence.create(bind=conn, checkfirst=True)
+    if conn.execute(select(sequence.c.name).where(sequence.c.name == 'complaint')).first() is None:
+        # Legacy suffixes were row count + 1, which never exceeds the highest grievance id + 1.
+        start = (conn.execute(select(func.max(grievance.c.id))).scalar() or 0) + 1
+        conn.execute(sequence.insert().values(name='complaint', next_value=start))
+
+
+@migration(5, "Hash-chained resolution ledger with Merkle checkpoints")
+def add_resolution_ledger(conn, metadata):
+    for table_name in ('ledger_entry', 'ledger_checkpoint', 'ledger_head'):
+        metadata.tables[table_name].create(bind=conn, checkfirst=True)
+    head = metadata.tables['ledger_head']
+    if conn.execute(select(head.c.name).where(head.c.name == 'main')).first() is None:
+        conn.execute(head.insert().values(name='main', sequence=0, head_hash=GENESIS_HASH))
+
+
+@migration(6, "Ledger block heights, block signatures and pending block receipts")
+def add_ledger_blocks(conn, metadata):
+    checkpoint = metadata.tables['ledger_checkpoint']
+    add_column_if_missing(conn, 'ledger_checkpoint', checkpoint.c.height)
+    add_column_if_missing(conn, 'ledger_checkpoint', checkpoint.c.signature)
+    ordered = conn.execute(select(checkpoint.c.id).order_by(checkpoint.c.end_sequence)).all()
+    for height, row in enumerate(ordered, start=1):
+        conn.execute(checkpoint.update().where(checkpoint.c.id == row.id).values(height=height))
+    create_index_if_missing(conn, named_index(metadata, 'ledger_checkpoint', 'ix_ledger_checkpoint_height'))
+    metadata.tables['ledger_receipt'].create(bind=conn, checkfirst=True)
+
+
+@migration(7, "Content-addressed attachment blobs")
+def move_attachments_to_blob_store(conn, metadata):
+    attachment = metadata.tables['attachment']
+    add_column_if_missing(conn, 'attachment', attachment.c.sha256)
+    create_index_if_missing(conn, named_index(metadata, 'attachment', 'ix_attachment_sha256'))
+
+    # Copies only: the original files stay until `flask blobs-gc --legacy`, so a failed
+    # migration (rolled back) never leaves rows pointing at deleted files.
+    store = BlobStore(blob_store_root())
+    rows = conn.execute(
+        select(attachment.c.id, attachment.c.file_path, attachment.c.file_type).where(attachment.c.sha256.is_(None))
+    ).all()
+    moved = created = 0
+    for row in rows:
+        source_path = os.path.join(PROJECT_ROOT, row.file_path)
+        if not os.path.isfile(source_path):
+            continue
+        blob_path, sha256, is_new = store.put_path(source_path, blob_extension(row.file_path, row.file_type))
+        conn.execute(attachment.update().where(attachment.c.id == row.id).values(file_path=store.key_for(blob_path), sha256=sha256))
+        moved += 1
+        created += is_new
+    if moved:
+        logger.info("Moved attachments into the blob store", extra={'attachments': moved, 'new_blobs': created})
+
+
+@migration(8, "Perceptual hashes on attachments for reused-photo detection")
+def add_attachment_fingerprints(conn, metadata):
+    attachment = metadata.tables['attachment']
+    add_column_if_missing(conn, 'attachment', attachment.c.dhash)
+    add_column_if_missing(conn, 'attachment', attachment.c.phash)
+
+
+@migration(9, "Backfill resolved_at on resolved, fraud and deleted grievances")
+def backfill_resolved_at(conn, metadata):
+    grievance = metadata.tables['grievance']
+    proof = metadata.tables['resolution_proof']
+    # One resolution route never set resolved_at; its proof's verified_at is the resolution time.
+    verified_at = (
+        select(func.max(proof.c.verified_at)).where(proof.c.grievance_id == grievance.c.id).scalar_subquery()
+    )
+    backfilled = conn.execute(
+        grievance.update()
+        .where(grievance.c.resolved_at.is_(None), grievance.c.status.in_(('RESOLVED', 'FRAUD', 'DELETED')))
+        .values(resolved_at=func.coalesce(verified_at, grievance.c.created_at))
+    ).rowcount
+    if backfilled:
+        logger.info("Backfilled resolved_at", extra={'grievances': backfilled})
+
+
+@migration(10, "Blob attachment paths stored relative to the blob store root")
+def relativize_blob_paths(conn, metadata):
+    attachment = metadata.tables['attachment']
+    rows = conn.execute(select(attachment.c.id, attachment.c.file_path).where(attachment.c.sha256.isnot(None))).all()
+    rewritten = 0
+    for row in rows:
+        if is_blob_key(row.file_path) or blob_sha256(row.file_path) is None:
+            continue
+        # Earlier rows hold '<root>/ab/cd/<sha><ext>', relative to the working directory or absolute.
+        key = '/'.join(row.file_path.replace('\\', '/').split('/')[-3:])
+        if is_blob_key(key):
+            conn.execute(attachment.update().where(attachment.c.id == row.id).values(file_path=key))
+            rewritten += 1
+    if rewritten:
+        logger.info("Stored blob attachment paths as store keys", extra={'attachments': rewritten})
+
+
+@migration(11, "Index on the deleted archive's coalesced resolution time")
+def add_resolved_key_index(conn, metadata):
+    create_index_if_missing(conn, named_index(metadata, 'grievance', 'ix_grievance_status_resolved_key'))
+
+
+@migration(12, "Image pre-filter verdict on attachments")
+def add_attachment_prefilter_verdict(conn, metadata):
+    add_column_if_missing(conn, 'attachment', metadata.tables['attachment'].c.prefilter_verdict)
+
+
+def run_migrations(engine, metadata):
+    """Applies every pending migration in version order. Returns the list of versions applied."""
+    schema_migrations.create(bind=engine, checkfirst=True)
+    applied_now = []
+    with engine.connect() as lock_conn:
+        locked = engine.dialect.name == 'postgresql'
+        if locked:
+            lock_conn.execute(text('SELECT pg_advisory_lock(:lock_id)'), {'lock_id': MIGRATION_LOCK_ID})
+        try:
+            with engine.connect() as conn:
+                done = applied_versions(conn)
+            for version, description, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+                if version in done:
+                    continue
+                with engine.begin() as conn:
+                    fn(conn, metadata)
+                    conn.execute(schema_migrations.insert().values(
+                        version=version, description=description, applied_at=datetime.now()
+                    ))
+                logger.info("Applied migration", extra={'version': version, 'description': description})
+                applied_now.append(version)
+        finally:
+            if locked:
+                lock_conn.execute(text('SELECT pg_advisory_unlock(:lock_id)'), {'lock_id': MIGRATION_LOCK_ID})
+                lock_conn.commit()
+    return applied_now
+
+
+def explain(conn, statement):
+    """Returns the planner output for a compiled statement as a list of text lines."""
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={'literal_binds': True})
+    if conn.dialect.name == 'sqlite':
+        rows = conn.execute(text(f'EXPLAIN QUERY PLAN {compiled}'))
+        return [str(row[-1]) for row in rows]
+    if conn.dialect.name == 'postgresql':
+        # Tiny tables make sequential scans look cheapest; disable them so the plan shows which index would be used.
+        conn.execute(text('SET LOCAL enable_seqscan = off'))
+    return [str(row[0]) for row in conn.execute(text(f'EXPLAIN {compiled}'))]
+
+
+def check_index_usage(engine, hot_queries):
+    """
+    EXPLAINs each (name, statement, expected_index) and reports whether the
+    planner picked the expected index. Returns a list of result dicts.
+    """
+    results = []
+    with engine.connect() as conn:
+        for name, statement, expected_index in hot_queries:
+            transaction = conn.begin()
+            try:
+                plan = explain(conn, statement)
+            finally:
+                transaction.rollback()
+            results.append({
+                'query': name,
+                'expected_index': expected_index,
+                'uses_index': any(expected_index in line for line in plan),
+                'plan': plan,
+            })
+    return results
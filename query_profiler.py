@@ -0,0 +1,125 @@
+"""
+Opt-in per-request SQL profiler for development and staging.
+
+Every statement a request executes is recorded with its duration. When the
+request ends the profile is checked for:
+
+- N+1 candidates: the same statement shape (literals and IN-lists
+  normalised away) run `repeat_threshold` or more times, which is what a
+  lazy relationship or per-row lookup inside a loop looks like;
+- slow statements over `slow_ms`, reported with the database's EXPLAIN
+  output for SELECTs;
+- a query budget per Flask endpoint. With `enforce` set, a request over
+  budget raises QueryBudgetExceeded, which fails the request (and any test
+  driving it through the test client) instead of only logging.
+
+Findings are logged as warnings; the profiler never changes a response
+unless `enforce` is on.
+"""
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+IN_LIST = re.compile(r'\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))+\s*\)')
+NAMED_PARAM = re.compile(r'%\((\w+?)(?:_\d+)?\)s|:(\w+?)(?:_\d+)?\b')
+NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+STRING = re.compile(r"'(?:[^']|'')*'")
+WHITESPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised at the end of a request that ran more statements than its endpoint's budget."""
+
+
+def statement_shape(statement):
+    """The statement with literals, parameter numbering and IN-list lengths normalised away."""
+    shape = WHITESPACE.sub(' ', statement).strip()
+    shape = STRING.sub('?', shape)
+    shape = NUMBER.sub('?', shape)
+    shape = NAMED_PARAM.sub('?', shape)
+    return IN_LIST.sub('(?...)', shape)
+
+
+def parse_budgets(spec):
+    """'officer_dashboard=20,public_dlt_audit=6' -> {'officer_dashboard': 20, 'public_dlt_audit': 6}."""
+    budgets = {}
+    for item in (spec or '').split(','):
+        if '=' in item:
+            endpoint, limit = item.split('=', 1)
+            budgets[endpoint.strip()] = int(limit)
+    return budgets
+
+
+class RequestProfile:
+    def __init__(self):
+        self.statements = []
+        self.total_seconds = 0.0
+
+    def record(self, statement, parameters, seconds, executemany=False):
+        self.statements.append((statement, parameters, seconds, executemany))
+        self.total_seconds += seconds
+
+    def repeated_shapes(self, threshold):
+        """(shape, count) for every shape run at least `threshold` times, most repeated first."""
+        counts = {}
+        for statement, _, _, _ in self.statements:
+            shape = statement_shape(statement)
+            counts[shape] = counts.get(shape, 0) + 1
+        repeated = [(shape, count) for shape, count in counts.items() if count >= threshold]
+        return sorted(repeated, key=lambda item: -item[1])
+
+
+def explain_statement(conn, statement, parameters):
+    if conn.dialect.name == 'sqlite':
+        rows = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)
+        return [str(row[-1]) for row in rows]
+    return [str(row[0]) for row in conn.exec_driver_sql(f'EXPLAIN {statement}', parameters)]
+
+
+class QueryProfiler:
+    def __init__(self, slow_ms=100.0, repeat_threshold=5, budgets=None, default_budget=0, enforce=False, explain=True):
+        self.slow_ms = slow_ms
+        self.repeat_threshold = repeat_threshold
+        self.budgets = budgets or {}
+        self.default_budget = default_budget
+        self.enforce = enforce
+        self.explain = explain
+
+    def budget_for(self, endpoint):
+        return self.budgets.get(endpoint, self.default_budget)
+
+    def finish(self, profile, endpoint, engine):
+        """
+        Logs the request's findings and returns them as a dict. Runs EXPLAIN on its
+        own connection, so call it after the profile has stopped recording.
+        """
+        report = {'endpoint': endpoint, 'queries': len(profile.statements), 'db_ms': round(profile.total_seconds * 1000, 1)}
+
+        repeated = profile.repeated_shapes(self.repeat_threshold)
+        for shape, count in repeated:
+            logger.warning("Possible N+1 query", extra={'endpoint': endpoint, 'repeats': count, 'statement': shape})
+        report['n_plus_one'] = [{'statement': shape, 'repeats': count} for shape, count in repeated]
+
+        slow = [s for s in profile.statements if s[2] * 1000 >= self.slow_ms]
+        report['slow'] = []
+        for statement, parameters, seconds, executemany in slow:
+            plan = None
+            if self.explain and not executemany and statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+                try:
+                    with engine.connect() as conn:
+                        plan = explain_statement(conn, statement, parameters)
+                except Exception as e:
+                    plan = [f"EXPLAIN failed: {e}"]
+            entry = {'statement': WHITESPACE.sub(' ', statement).strip(), 'ms': round(seconds * 1000, 1), 'plan': plan}
+            logger.warning("Slow query", extra=dict(entry, endpoint=endpoint))
+            report['slow'].append(entry)
+
+        budget = self.budget_for(endpoint)
+        report['budget'] = budget
+        if budget and len(profile.statements) > budget:
+            message = f"{endpoint} ran {len(profile.statements)} queries; its budget is {budget}."
+            logger.warning("Query budget exceeded", extra={'endpoint': endpoint, 'queries': len(profile.statements), 'budget': budget})
+            if self.enforce:
+                raise QueryBudgetExceeded(message)
+        return report
@@ -0,0 +1,82 @@
+"""
+Helpers for `flask retriage`, the offline re-run of triage over stored grievances.
+
+The command streams grievances in id order, triages each batch on a bounded
+thread pool behind a shared RateLimiter and writes the batch back in one
+bulk update. After every batch the last id written is saved to a checkpoint
+file, so an interrupted run picks up after the last completed batch. A
+checkpoint is only resumed when it was written for the same triage prompt
+version and options.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Triage result key -> Grievance column it is stored in.
+TRIAGE_FIELDS = {
+    'classification': 'grievance_type',
+    'department_id': 'assigned_officer_id',
+    'raw_text_processed': 'raw_text_processed',
+    'professional_text': 'professional_text',
+}
+
+
+class RateLimiter:
+    """Token bucket shared by worker threads: at most `rate` acquisitions per second, bursts up to `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def triage_changes(row, ai_results):
+    """Column -> (old, new) for every triage field the new result changes on `row`."""
+    changes = {}
+    for result_key, column in TRIAGE_FIELDS.items():
+        old, new = getattr(row, column), ai_results.get(result_key)
+        if new is not None and new != old:
+            changes[column] = (old, new)
+    return changes
+
+
+def load_checkpoint(path, run_key):
+    """The saved state for `run_key`, or None when there is none or it belongs to a different run."""
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if state.get('run_key') == run_key else None
+
+
+def save_checkpoint(path, state):
+    """Writes the state atomically, so an interrupt mid-write keeps the previous checkpoint."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as tmp:
+            json.dump(state, tmp)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -0,0 +1,46 @@
+"""
+JSON-lines logging with the current request's ID attached.
+
+Every record is written to stdout as one JSON object with the time, level,
+logger name, message and request_id (when logged inside a request), plus
+any fields passed through `extra=`. Render and gunicorn collect stdout, so
+no handler beyond the stream is needed.
+"""
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+
+from flask import g, has_request_context
+
+# Attributes every LogRecord has; anything else on a record came from `extra=`.
+STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if has_request_context() and 'request_id' in g:
+            entry['request_id'] = g.request_id
+        for name, value in vars(record).items():
+            if name not in STANDARD_ATTRS:
+                entry[name] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level='INFO'):
+    """Routes the root logger to stdout as JSON lines. Safe to call more than once."""
+    root = logging.getLogger()
+    if any(isinstance(handler.formatter, JsonFormatter) for handler in root.handlers):
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter())
+    root.addHandler(handler)
+    root.setLevel(level)
@@ -0,0 +1,23 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# app.py connects to the database and runs migrations at import time, so it has to be
+# pointed at a scratch SQLite file (and blob directory) before the first import.
+SCRATCH_DIR = tempfile.mkdtemp(prefix='grievance-tests-')
+os.environ['DB_URL'] = f"sqlite:///{os.path.join(SCRATCH_DIR, 'test.db')}"
+os.environ['BLOB_STORE_ROOT'] = os.path.join(SCRATCH_DIR, 'blobs')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    import app as app_module
+    return app_module
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
@@ -0,0 +1,69 @@
+"""Attachment rows record blobs by store-relative key, never by server path."""
+import io
+import os
+
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+from blob_store import is_blob_key
+from migrations import relativize_blob_paths
+
+SHA = 'ab' + 'cd' + '0' * 60
+
+
+def jpeg_upload():
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), (120, 30, 200)).save(buffer, 'JPEG')
+    buffer.seek(0)
+    return FileStorage(buffer, 'proof.jpg', content_type='image/jpeg')
+
+
+def add_grievance(A, tag):
+    A.db.session.add(A.User(user_id=f"U_{tag}", name=tag, mobile_number=tag, password_hash='x', aadhar_number=f"77770000{len(tag):04d}"))
+    grievance = A.Grievance(user_id=f"U_{tag}", complaint_id=f"{tag}-1", raw_text='x', status='PENDING')
+    A.db.session.add(grievance)
+    A.db.session.flush()
+    return grievance
+
+
+def test_stored_attachment_is_a_key_served_under_uploads(app_module, client, tmp_path, monkeypatch):
+    A = app_module
+    monkeypatch.setitem(A.app.config, 'UPLOADS_ROOT', str(tmp_path / 'uploads'))
+    monkeypatch.setattr(A.blob_store, 'root', str(tmp_path / 'uploads' / 'blobs'))
+    with A.app.app_context():
+        grievance = add_grievance(A, 'blobkey')
+        attachment = A.store_attachment(grievance, jpeg_upload())
+        A.db.session.commit()
+        grievance_id, file_path = grievance.id, attachment.file_path
+
+    assert is_blob_key(file_path)
+    assert os.path.isfile(A.attachment_file(file_path))
+    with client.session_transaction() as session:
+        session['logged_in_officer'] = True
+    listed = client.get(f"/api/complaint/{grievance_id}").get_json()['grievance']['attachments'][0]['file_path']
+    assert listed == f"uploads/blobs/{file_path}"
+    response = client.get('/' + listed)
+    assert response.status_code == 200
+    response.close()
+
+
+def test_migration_rewrites_older_blob_paths_to_keys(app_module):
+    A = app_module
+    with A.app.app_context():
+        grievance = add_grievance(A, 'blobmigrate')
+        paths = [
+            f"uploads/blobs/ab/cd/{SHA}.jpg",
+            f"/srv/app/uploads/blobs/ab/cd/{SHA}.png",
+            'uploads/profile/grievance/legacy.jpg',
+        ]
+        rows = [A.Attachment(grievance_id=grievance.id, file_path=path, sha256=SHA, file_type='image/jpeg') for path in paths]
+        A.db.session.add_all(rows)
+        A.db.session.commit()
+        ids = [row.id for row in rows]
+
+        with A.db.engine.begin() as conn:
+            relativize_blob_paths(conn, A.db.metadata)
+        A.db.session.expire_all()
+        migrated = [A.db.session.get(A.Attachment, attachment_id).file_path for attachment_id in ids]
+
+    assert migrated == [f"ab/cd/{SHA}.jpg", f"ab/cd/{SHA}.png", 'uploads/profile/grievance/legacy.jpg']
@@ -0,0 +1,71 @@
+"""An open Gemini circuit leaves photos unscored instead of treating them as failed checks."""
+import io
+import random
+import time
+
+from PIL import Image
+
+
+def photo_bytes(seed):
+    rng = random.Random(seed)
+    image = Image.new('RGB', (320, 240))
+    image.putdata([tuple(rng.randrange(256) for _ in range(3)) for _ in range(320 * 240)])
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def open_circuit(A, monkeypatch):
+    monkeypatch.setenv('GEMINI_API_KEY', 'test-key')
+    monkeypatch.setattr(A.gemini_client.breaker, 'opened_at', time.monotonic())
+
+
+def test_resolution_is_not_flagged_as_fraud_while_the_circuit_is_open(app_module, client, monkeypatch):
+    A = app_module
+    open_circuit(A, monkeypatch)
+    with A.app.app_context():
+        A.db.session.add(A.User(user_id='U_circuit', name='c', mobile_number='c', password_hash='x', aadhar_number='555500000301'))
+        grievance = A.Grievance(user_id='U_circuit', complaint_id='CIRCUIT-1', raw_text='Pothole', status='PENDING', grievance_type='Roads')
+        A.db.session.add(grievance)
+        A.db.session.commit()
+        grievance_id = grievance.id
+    with client.session_transaction() as session:
+        session.update(logged_in_officer=True, officer_id='ENG_001')
+
+    response = client.post(
+        f"/api/resolution/submit/{grievance_id}",
+        data={'resolution_proof': (io.BytesIO(photo_bytes(3)), 'after.jpg', 'image/jpeg')},
+        content_type='multipart/form-data'
+    )
+
+    assert response.status_code == 503
+    assert response.get_json()['status'] == 'CV_AUDIT_UNAVAILABLE'
+    assert response.headers['Retry-After']
+    with A.app.app_context():
+        grievance = A.db.session.get(A.Grievance, grievance_id)
+        assert grievance.status == 'PENDING'
+        # The photo was not kept, so resubmitting it later is not taken for a reused photo.
+        assert A.Attachment.query.filter_by(grievance_id=grievance_id).count() == 0
+
+
+def test_complaint_is_queued_for_triage_while_the_circuit_is_open(app_module, client, monkeypatch):
+    A = app_module
+    open_circuit(A, monkeypatch)
+    monkeypatch.setitem(A.app.config, 'TRIAGE_MODE', 'sync')
+    queued = []
+    monkeypatch.setattr(A, 'enqueue_triage_job', lambda job_id, delay=0: queued.append(job_id))
+    with A.app.app_context():
+        A.db.session.add(A.User(user_id='U_circuit_sync', name='s', mobile_number='s', password_hash='x', aadhar_number='555500000302'))
+        A.db.session.commit()
+    with client.session_transaction() as session:
+        session.update(logged_in=True, user_id='U_circuit_sync')
+
+    response = client.post(
+        '/api/grievances/submit',
+        data={'raw_text': 'Overflowing drain', 'location': 'Ward 9', 'proof_photos': (io.BytesIO(photo_bytes(4)), 'drain.jpg', 'image/jpeg')},
+        content_type='multipart/form-data'
+    )
+
+    assert response.status_code == 202
+    assert response.get_json()['status'] == 'TRIAGE_PENDING'
+    assert len(queued) == 1
@@ -0,0 +1,90 @@
+"""Concurrent complaint-number allocation must never hand the same number out twice."""
+import multiprocessing
+import threading
+
+import pytest
+
+THREADS = 16
+RESERVATIONS_PER_THREAD = 25
+
+
+def run_threads(target, count=THREADS):
+    barrier = threading.Barrier(count)
+    errors = []
+
+    def worker():
+        barrier.wait()
+        try:
+            target()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def assert_disjoint(ranges):
+    numbers = [n for start, end in ranges for n in range(start, end)]
+    assert len(numbers) == len(set(numbers))
+
+
+def test_reserved_blocks_never_overlap_across_threads(app_module):
+    ranges, lock = [], threading.Lock()
+
+    def reserve():
+        with app_module.app.app_context():
+            for i in range(RESERVATIONS_PER_THREAD):
+                block = app_module.reserve_complaint_numbers(1 + i % 5)
+                with lock:
+                    ranges.append(block)
+
+    run_threads(reserve)
+
+    assert len(ranges) == THREADS * RESERVATIONS_PER_THREAD
+    assert_disjoint(ranges)
+    # Blocks are handed out back to back, with no gaps.
+    ordered = sorted(ranges)
+    assert all(previous[1] == current[0] for previous, current in zip(ordered, ordered[1:]))
+
+
+def test_complaint_ids_are_unique_across_threads(app_module, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'COMPLAINT_ID_BLOCK_SIZE', 7)
+    ids, lock = [], threading.Lock()
+
+    def generate():
+        with app_module.app.app_context():
+            for _ in range(RESERVATIONS_PER_THREAD):
+                complaint_id = app_module.generate_complaint_id('123412341234')
+                with lock:
+                    ids.append(complaint_id)
+
+    run_threads(generate)
+
+    assert len(ids) == len(set(ids)) == THREADS * RESERVATIONS_PER_THREAD
+
+
+def reserve_in_child(queue):
+    import app as app_module
+    # Connections inherited from the parent must not be shared with it.
+    with app_module.app.app_context():
+        app_module.db.engine.dispose(close=False)
+        queue.put([app_module.reserve_complaint_numbers(3) for _ in range(RESERVATIONS_PER_THREAD)])
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason='needs fork to share the imported app')
+def test_reserved_blocks_never_overlap_across_processes(app_module):
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    workers = [context.Process(target=reserve_in_child, args=(queue,)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    ranges = [block for _ in workers for block in queue.get(timeout=60)]
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    assert_disjoint(ranges)
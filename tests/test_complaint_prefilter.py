@@ -0,0 +1,85 @@
+"""Complaint photos are pre-filtered at submission, and the triage job trusts the stored verdict."""
+import io
+import random
+
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+
+def photo_bytes(seed):
+    rng = random.Random(seed)
+    image = Image.new('RGB', (320, 240))
+    image.putdata([tuple(rng.randrange(256) for _ in range(3)) for _ in range(320 * 240)])
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def add_user(A, user_id, aadhar_number):
+    A.db.session.add(A.User(user_id=user_id, name=user_id, mobile_number=user_id, password_hash='x', aadhar_number=aadhar_number))
+
+
+def log_in(client, user_id):
+    with client.session_transaction() as session:
+        session.update(logged_in=True, user_id=user_id)
+
+
+def submit(client, upload, content_type):
+    return client.post(
+        '/api/grievances/submit',
+        data={'raw_text': 'Broken streetlight', 'location': 'Ward 4', 'proof_photos': (io.BytesIO(upload), 'proof', content_type)},
+        content_type='multipart/form-data'
+    )
+
+
+def test_photo_from_another_users_complaint_is_rejected(app_module, client):
+    A = app_module
+    photo = photo_bytes(21)
+    with A.app.app_context():
+        add_user(A, 'U_owner', '555500002101')
+        add_user(A, 'U_copier', '555500002102')
+        grievance = A.Grievance(user_id='U_owner', complaint_id='PREFILTER-1', raw_text='Pothole', status='PENDING', grievance_type='Roads')
+        A.db.session.add(grievance)
+        A.db.session.flush()
+        upload = FileStorage(io.BytesIO(photo), 'proof.jpg', content_type='image/jpeg')
+        A.store_attachment(grievance, upload)
+        A.db.session.commit()
+    log_in(client, 'U_copier')
+
+    response = submit(client, photo, 'image/jpeg')
+
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body['classification'] == 'PHOTO_REJECTED'
+    assert 'complaint PREFILTER-1' in body['reason']
+
+
+def test_triage_job_follows_the_submission_verdict(app_module, client, monkeypatch):
+    A = app_module
+    monkeypatch.setitem(A.app.config, 'TRIAGE_MODE', 'async')
+    monkeypatch.setattr(A, 'enqueue_triage_job', lambda job_id, delay=0: None)
+    sent_images = []
+
+    def triage_submission(raw_text, location_tag, image_base64_data=None):
+        sent_images.append(image_base64_data)
+        return {'classification': 'Electricity', 'professional_text': 'Streetlight out.', 'department_id': 'ENG_001'}, (0.9 if image_base64_data else None), None
+
+    monkeypatch.setattr(A, 'triage_submission', triage_submission)
+    with A.app.app_context():
+        add_user(A, 'U_async', '555500002103')
+        A.db.session.commit()
+    log_in(client, 'U_async')
+
+    for upload, content_type in ((b'\x00\x00\x00\x18ftypmp42', 'video/mp4'), (photo_bytes(22), 'image/jpeg')):
+        assert submit(client, upload, content_type).status_code == 202
+        with A.app.app_context():
+            job = A.TriageJob.query.order_by(A.TriageJob.id.desc()).first()
+            verdict = A.Attachment.query.filter_by(grievance_id=job.grievance_id).one().prefilter_verdict
+            job_id = job.id
+        A.run_triage_job(job_id)
+        with A.app.app_context():
+            assert A.db.session.get(A.TriageJob, job_id).status == 'DONE'
+        assert verdict == ('pass' if content_type == 'video/mp4' else 'model')
+
+    assert sent_images[0] is None
+    assert sent_images[1]
@@ -0,0 +1,43 @@
+"""/api/restore/deleted must list in the same order with and without pagination."""
+from datetime import datetime, timedelta
+
+
+def test_paginated_deleted_list_matches_legacy_order(app_module, client):
+    A = app_module
+    base = datetime(2025, 1, 1)
+    with A.app.app_context():
+        A.db.session.add(A.User(user_id='U_deleted', name='d', mobile_number='d', password_hash='x', aadhar_number='999900001111'))
+        for i in range(7):
+            # created_at runs the opposite way to resolved_at, and two grievances share a resolved_at.
+            A.db.session.add(A.Grievance(
+                user_id='U_deleted', complaint_id=f"DELETED-{i}", raw_text='x', status='DELETED',
+                created_at=base + timedelta(days=i), resolved_at=base + timedelta(days=30 - min(i, 5))
+            ))
+        for i in range(2):
+            # Resolved before resolved_at was recorded: these sort by created_at.
+            A.db.session.add(A.Grievance(
+                user_id='U_deleted', complaint_id=f"DELETED-LEGACY-{i}", raw_text='x', status='DELETED',
+                created_at=base + timedelta(days=27, hours=i), resolved_at=None
+            ))
+        A.db.session.commit()
+    with client.session_transaction() as session:
+        session['logged_in_officer'] = True
+
+    legacy = [g['id'] for g in client.get('/api/restore/deleted').get_json()['deleted_grievances']]
+
+    assert len(legacy) == 9
+    for limit in (2, 3):
+        assert page_through(client, limit) == legacy
+
+
+def page_through(client, limit):
+    paged, cursor = [], None
+    while True:
+        url = f"/api/restore/deleted?limit={limit}" + (f"&cursor={cursor}" if cursor else '')
+        response = client.get(url)
+        assert response.status_code == 200
+        body = response.get_json()
+        paged.extend(g['id'] for g in body['deleted_grievances'])
+        cursor = body['next_cursor']
+        if not cursor:
+            return paged
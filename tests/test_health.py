@@ -0,0 +1,28 @@
+"""/health reuses its database probe for a short TTL instead of connecting on every request."""
+
+
+class CountingEngine:
+    def __init__(self, engine):
+        self.engine = engine
+        self.connects = 0
+
+    def connect(self):
+        self.connects += 1
+        return self.engine.connect()
+
+
+def test_health_probes_the_database_once_per_ttl(app_module, client, monkeypatch):
+    A = app_module
+    counting = CountingEngine(A.engine)
+    monkeypatch.setattr(A, 'engine', counting)
+    monkeypatch.setitem(A.health_db_probe, 'status', None)
+    monkeypatch.setitem(A.app.config, 'HEALTH_DB_CHECK_TTL_SECONDS', 60)
+
+    statuses = [client.get('/health').get_json()['db_status'] for _ in range(3)]
+
+    assert statuses == ['connected'] * 3
+    assert counting.connects == 1
+
+    monkeypatch.setitem(A.app.config, 'HEALTH_DB_CHECK_TTL_SECONDS', 0)
+    client.get('/health')
+    assert counting.connects == 2
@@ -0,0 +1,14 @@
+"""Each hot grievance query must be planned with the index migration 002 added for it."""
+from migrations import check_index_usage
+
+
+def test_hot_queries_use_their_indexes(app_module):
+    A = app_module
+    with A.app.app_context():
+        results = check_index_usage(A.db.engine, A.hot_grievance_queries())
+
+    assert {r['expected_index'] for r in results} >= {
+        'ix_grievance_user_created', 'ix_grievance_officer_created', 'ix_grievance_status_resolved_key',
+    }
+    missing = {r['query']: r['plan'] for r in results if not r['uses_index']}
+    assert missing == {}
@@ -0,0 +1,77 @@
+"""The grievance listings must issue the same number of statements however many rows they return."""
+import itertools
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+AADHAR_NUMBERS = itertools.count(100000000000)
+
+
+@contextmanager
+def count_statements(engine):
+    counter = {'statements': 0}
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        counter['statements'] += 1
+
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+
+
+def seed_grievances(app_module, tag, count, attachments_each=2):
+    """A citizen and an officer owning `count` grievances with `attachments_each` attachments apiece."""
+    A = app_module
+    user_id, officer_id = f"U_{tag}", f"O_{tag}"
+    with A.app.app_context():
+        A.db.session.add(A.User(
+            user_id=user_id, name=tag, mobile_number=tag, password_hash='x', aadhar_number=str(next(AADHAR_NUMBERS))
+        ))
+        A.db.session.add(A.Officer(officer_id=officer_id, name=tag, email_id=f"{tag}@example.com", password='x'))
+        for i in range(count):
+            grievance = A.Grievance(
+                user_id=user_id, complaint_id=f"{tag}-{i}", raw_text='Streetlight out', status='PENDING',
+                assigned_officer_id=officer_id, seriousness='STANDARD', priority_score=1
+            )
+            A.db.session.add(grievance)
+            A.db.session.flush()
+            for j in range(attachments_each):
+                A.db.session.add(A.Attachment(
+                    grievance_id=grievance.id, file_path=f"uploads/blobs/{tag}-{i}-{j}.jpg", file_type='image/jpeg'
+                ))
+        A.db.session.commit()
+    return user_id, officer_id
+
+
+def statements_for(app_module, client, url, user_id, officer_id, expected_rows):
+    with client.session_transaction() as session:
+        session.update(logged_in=True, user_id=user_id, logged_in_officer=True, officer_id=officer_id)
+    with app_module.app.app_context():
+        engine = app_module.db.engine
+    with count_statements(engine) as counter:
+        response = client.get(url)
+    assert response.status_code == 200
+    body = response.get_json()
+    rows = body if isinstance(body, list) else body.get('grievances', [])
+    assert len(rows) == expected_rows
+    return counter['statements']
+
+
+@pytest.mark.parametrize('url', [
+    '/api/grievances/me',
+    '/api/grievances/me?limit=100',
+    '/api/officer/dashboard',
+    '/api/officer/dashboard?limit=100',
+])
+def test_listing_statement_count_does_not_grow_with_rows(app_module, client, url):
+    tag = url.strip('/').replace('/', '_').replace('?', '_').replace('=', '_')
+    small = seed_grievances(app_module, f"{tag}_small", 3)
+    large = seed_grievances(app_module, f"{tag}_large", 30)
+
+    small_count = statements_for(app_module, client, url, *small, expected_rows=3)
+    large_count = statements_for(app_module, client, url, *large, expected_rows=30)
+
+    assert small_count == large_count
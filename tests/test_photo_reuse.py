@@ -0,0 +1,63 @@
+"""Resolution photos are indexed on every resolution route, so reusing one is caught."""
+import io
+import random
+from types import SimpleNamespace
+
+from PIL import Image
+
+from phash_index import PerceptualIndex
+
+
+def photo_bytes(seed):
+    rng = random.Random(seed)
+    image = Image.new('RGB', (320, 240))
+    image.putdata([tuple(rng.randrange(256) for _ in range(3)) for _ in range(320 * 240)])
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def test_resolution_submit_detects_a_reused_photo(app_module, client, monkeypatch):
+    A = app_module
+    monkeypatch.setattr(A, 'gemini_cv_audit', lambda *args, **kwargs: (0.95, 'Resolved.'))
+    with A.app.app_context():
+        A.db.session.add(A.User(user_id='U_reuse', name='r', mobile_number='r', password_hash='x', aadhar_number='555500001111'))
+        grievances = [
+            A.Grievance(user_id='U_reuse', complaint_id=f"REUSE-{i}", raw_text='Pothole', status='PENDING', grievance_type='Roads')
+            for i in range(2)
+        ]
+        A.db.session.add_all(grievances)
+        A.db.session.commit()
+        first_id, second_id = (g.id for g in grievances)
+    with client.session_transaction() as session:
+        session.update(logged_in_officer=True, officer_id='ENG_001')
+    photo = photo_bytes(1)
+
+    def submit(grievance_id):
+        return client.post(
+            f"/api/resolution/submit/{grievance_id}",
+            data={'resolution_proof': (io.BytesIO(photo), 'after.jpg', 'image/jpeg')},
+            content_type='multipart/form-data'
+        )
+
+    assert submit(first_id).status_code == 200
+    reused = submit(second_id)
+
+    assert reused.status_code == 409
+    assert 'reuses an earlier upload from complaint REUSE-0' in reused.get_json()['reason']
+
+
+def test_index_picks_up_rows_that_commit_out_of_id_order():
+    visible = []
+    index = PerceptualIndex(lambda after_id: [row for row in visible if row.id > after_id], max_distance=0)
+
+    def row(row_id, key):
+        return SimpleNamespace(id=row_id, grievance_id=row_id, file_type='image/jpeg', dhash=f"{key:016x}", phash=f"{key:016x}")
+
+    visible.append(row(11, 0xAAAA))
+    assert index.find((0xBBBB, 0xBBBB)) == []
+    # Id 10 was allocated first but committed after 11 had been indexed.
+    visible.append(row(10, 0xBBBB))
+    assert [m['attachment_id'] for m in index.find((0xBBBB, 0xBBBB))] == [10]
+    # Re-reading the overlap does not index a row twice.
+    assert index.stats()['indexed_photos'] == 2
@@ -0,0 +1,204 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+
+def triage_cache_key(raw_text, location_tag, prompt_version):
+    """Content address for a triage request: case and whitespace differences map to the same key."""
+    normalized_text = " ".join((raw_text or "").lower().split())
+    normalized_location = " ".join((location_tag or "").lower().split())
+    key_source = f"{prompt_version}\x1f{normalized_text}\x1f{normalized_location}"
+    return hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+
+
+class MemoryCacheBackend:
+    """Per-worker LRU dictionary with absolute expiry times."""
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (value, time.time() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class DatabaseCacheBackend:
+    """
+    Shared cache table visible to every gunicorn worker.
+
+    Uses its own short transactions on the engine so a cache write never
+    commits (or rolls back) whatever the request has pending on db.session.
+    """
+
+    EVICTION_INTERVAL = 64
+
+    def __init__(self, db, model, max_entries=50000):
+        self.db = db
+        self.table = model.__table__
+        self.max_entries = max_entries
+        self.writes = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        now = datetime.now()
+        with self.db.engine.begin() as conn:
+            row = conn.execute(
+                select(self.table.c.result_json, self.table.c.expires_at).where(self.table.c.cache_key == key)
+            ).first()
+            if row is None:
+                return None
+            if row.expires_at < now:
+                conn.execute(delete(self.table).where(self.table.c.cache_key == key))
+                return None
+            conn.execute(update(self.table).where(self.table.c.cache_key == key).values(last_used_at=now))
+        return json.loads(row.result_json)
+
+    def set(self, key, value, ttl):
+        now = datetime.now()
+        values = {
+            'result_json': json.dumps(value),
+            'expires_at': now + timedelta(seconds=ttl),
+            'last_used_at': now,
+        }
+        try:
+            with self.db.engine.begin() as conn:
+                updated = conn.execute(update(self.table).where(self.table.c.cache_key == key).values(**values))
+                if updated.rowcount == 0:
+                    conn.execute(insert(self.table).values(cache_key=key, **values))
+        except IntegrityError:
+            # Another worker inserted the same key first; its result is just as good.
+            pass
+
+        with self.lock:
+            self.writes += 1
+            due = self.writes % self.EVICTION_INTERVAL == 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        with self.db.engine.begin() as conn:
+            conn.execute(delete(self.table).where(self.table.c.expires_at < datetime.now()))
+            total = conn.execute(select(func.count()).select_from(self.table)).scalar()
+            if total > self.max_entries:
+                oldest = select(self.table.c.cache_key).order_by(self.table.c.last_used_at.asc()).limit(total - self.max_entries)
+                conn.execute(delete(self.table).where(self.table.c.cache_key.in_(oldest.scalar_subquery())))
+
+    def clear(self):
+        with self.db.engine.begin() as conn:
+            conn.execute(delete(self.table))
+
+
+class TieredCacheBackend:
+    """Memory in front of the shared table; shared hits are promoted into the local LRU."""
+
+    def __init__(self, memory_backend, shared_backend, promote_ttl=300):
+        self.memory = memory_backend
+        self.shared = shared_backend
+        self.promote_ttl = promote_ttl
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        value = self.shared.get(key)
+        if value is not None:
+            self.memory.set(key, value, self.promote_ttl)
+        return value
+
+    def set(self, key, value, ttl):
+        self.memory.set(key, value, ttl)
+        self.shared.set(key, value, ttl)
+
+    def clear(self):
+        self.memory.clear()
+        self.shared.clear()
+
+
+class TriageCache:
+    def __init__(self, backend, ttl=86400):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        try:
+            value = self.backend.get(key)
+        except Exception:
+            # A broken cache must never block triage; treat it as a miss.
+            logger.exception("Triage cache lookup failed")
+            value = None
+            with self.lock:
+                self.errors += 1
+        with self.lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        try:
+            self.backend.set(key, value, self.ttl)
+        except Exception:
+            logger.exception("Triage cache store failed")
+            with self.lock:
+                self.errors += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def build_triage_cache(backend_name, db=None, model=None, ttl=86400, max_entries=2048):
+    memory_backend = MemoryCacheBackend(max_entries=max_entries)
+    if backend_name == 'memory':
+        return TriageCache(memory_backend, ttl=ttl)
+    shared_backend = DatabaseCacheBackend(db, model, max_entries=max_entries * 25)
+    if backend_name == 'database':
+        return TriageCache(shared_backend, ttl=ttl)
+    if backend_name == 'tiered':
+        return TriageCache(TieredCacheBackend(memory_backend, shared_backend, promote_ttl=min(ttl, 300)), ttl=ttl)
+    raise ValueError(f"Unknown triage cache backend: {backend_name}")